@@ -75,6 +75,7 @@ __all__ = [
     'EncryptedSym',
     'EncryptedSymAead',
     'Enum',
+    'EnumDecodeMapping',
     'EnumInteger',
     'EnumIntegerString',
     'Error',
@@ -133,6 +134,7 @@ __all__ = [
     'Probe',
     'ProcessXor',
     'RawCopy',
+    'RawCopyContainer',
     'Rebuffered',
     'RebufferedBytesIO',
     'Rebuild',
@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
-import pdb
-import io, binascii, itertools, collections, os
+import io, binascii, itertools, collections, functools, os, sys
 
 from typing import Tuple, Dict, Any
 
 from dingsda.errors import *
 from dingsda.lib import *
+from dingsda.lib.binary import _numpy
 from dingsda.expr import *
 from dingsda.helpers import *
 from dingsda.version import version_string
@@ -51,28 +51,51 @@ class Construct(object):
 
     All constructs have a name and flags. The name is used for naming struct members and context dictionaries. Note that the name can be a string, or None by default. A single underscore "_" is a reserved name, used as up-level in nested containers. The name should be descriptive, short, and valid as a Python identifier, although these rules are not enforced. The flags specify additional behavioral information about this construct. Flags are used by enclosing constructs to determine a proper course of action. Flags are often inherited from inner subconstructs but that depends on each class.
     """
+    __slots__ = ("name", "docs", "flagbuildnone", "parsed", "_cached_repr")
+
+    # optional methods for processing many elements at once, see Array. Subclasses implementing them set these to methods
+    # with the signatures _parse_batch(stream, count, context, path) -> list and
+    # _build_batch(objs, stream, context, path) -> bool, returning False if nothing was built and the elements need to be
+    # built one by one instead.
+    _parse_batch = None
+    _build_batch = None
+
     def __init__(self):
         self.name = None
         self.docs = ""
         self.flagbuildnone = False
         self.parsed = None
+        self._cached_repr = None
 
     def __repr__(self):
-        return "<%s%s%s%s>" % (self.__class__.__name__, " "+self.name if self.name else "", " +nonbuild" if self.flagbuildnone else "", " +docs" if self.docs else "", )
+        # the repr only depends on attributes set in the constructor, so it is computed once
+        ret = getattr(self, "_cached_repr", None)
+        if ret is None:
+            ret = self._cached_repr = self._repr()
+        return ret
+
+    def _repr(self):
+        """Override in your subclass, the result gets cached by __repr__."""
+        return f"<{self.__class__.__name__}{' '+self.name if self.name else ''}{' +nonbuild' if self.flagbuildnone else ''}{' +docs' if self.docs else ''}>"
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _all_slots(cls):
+        """Used internally. Returns the slot names of the class and all its bases, computed once per class."""
+        slots = []
+        for c in cls.__mro__:
+            slots.extend(c.__dict__.get("__slots__", ()))
+        return tuple(slots)
 
     def __getstate__(self):
         attrs = {}
         if hasattr(self, "__dict__"):
             attrs.update(self.__dict__)
-        slots = []
-        c = self.__class__
-        while c is not None:
-            if hasattr(c, "__slots__"):
-                slots.extend(c.__slots__)
-            c = c.__base__
-        for name in slots:
-            if hasattr(self, name):
+        for name in self._all_slots():
+            try:
                 attrs[name] = getattr(self, name)
+            except AttributeError:
+                pass
         return attrs
 
     def __setstate__(self, attrs):
@@ -82,6 +105,8 @@ class Construct(object):
     def __copy__(self):
         self2 = object.__new__(self.__class__)
         self2.__setstate__(self.__getstate__())
+        # the copy may get renamed or otherwise modified
+        self2._cached_repr = None
         return self2
 
     def parse(self, data: bytes, **contextkw):
@@ -98,18 +123,14 @@ class Construct(object):
 
         :raises ConstructError: raised for any reason
         """
+        # BytesIO shares the buffer of a bytes object until it is written to, so no copy happens here
         return self.parse_stream(io.BytesIO(data), **contextkw)
 
     def parse_stream(self, stream, **contextkw):
         r"""
         Parse a stream. Files, pipes, sockets, and other streaming sources of data are handled by this method. See parse().
         """
-        context = Container(**contextkw)
-        context._preprocessing = False
-        context._parsing = True
-        context._building = False
-        context._sizing = False
-        context._params = context
+        context = create_root_context(contextkw, parsing=True)
         try:
             return self._parsereport(stream, context, "(parsing)")
         except CancelParsing:
@@ -172,10 +193,15 @@ class Construct(object):
             :return obj: the preprocessed object
             :return extra_info: a dictionary containing extra information regarding offset, size, etc.
         """
-        ctx = Container(**context)
-        # FIXME: i do not know a better solution for this yet
-        if isinstance(obj, dict) or isinstance(obj, Container):
-            ctx.update(obj)
+        if isinstance(obj, (int, float)):
+            # plain numbers cannot be iterated or merged into the context, so sizing them cannot modify it.
+            # this skips copying the whole context for every numeric field.
+            ctx = context
+        else:
+            ctx = Container(context)
+            # FIXME: i do not know a better solution for this yet
+            if isinstance(obj, dict):
+                ctx.update(obj)
         size = self._sizeof(obj, ctx, path)
         return obj, {"_offset": offset, "_size": size, "_endoffset": offset + size}
 
@@ -193,6 +219,7 @@ class Construct(object):
 
         :raises ConstructError: raised for any reason
         """
+        # getvalue() hands out the internal buffer of BytesIO without copying, as long as nothing else references it
         stream = io.BytesIO()
         self.build_stream(obj, stream, **contextkw)
         return stream.getvalue()
@@ -201,12 +228,7 @@ class Construct(object):
         r"""
         Build an object directly into a stream. See build().
         """
-        context = Container(**contextkw)
-        context._parsing = False
-        context._preprocessing = False
-        context._building = True
-        context._sizing = False
-        context._params = context
+        context = create_root_context(contextkw, building=True)
         self._build(obj, stream, context, "(building)")
 
     def build_file(self, obj, filename, **contextkw):
@@ -235,12 +257,7 @@ class Construct(object):
         :returns: an ElementTree
         """
 
-        context = Container(**contextkw)
-        context._preprocessing = False
-        context._parsing = False
-        context._building = False
-        context._sizing = False
-        context._params = context
+        context = create_root_context(contextkw)
         context[name] = obj
         # create root node
         xml = ET.Element(name)
@@ -256,12 +273,7 @@ class Construct(object):
         :returns: a Container
         """
 
-        context = Container(**contextkw)
-        context._preprocessing = False
-        context._parsing = False
-        context._building = False
-        context._sizing = False
-        context._params = context
+        context = create_root_context(contextkw)
         # create root node
         parent = ET.Element("Root")
         parent.append(xml)
@@ -284,12 +296,7 @@ class Construct(object):
             :return obj: the preprocessed object
             :return extra_info: the dictionary containing extra information for the *current* object, like offset, size, etc.
         """
-        context = Container(**contextkw)
-        context._preprocessing = True
-        context._parsing = False
-        context._building = False
-        context._sizing = False
-        context._params = context
+        context = create_root_context(contextkw, preprocessing=True)
 
         obj, extra_info = self._preprocess(obj=obj, context=context, path="(preprocess)")
 
@@ -311,12 +318,7 @@ class Construct(object):
 
         :raises SizeofError: size could not be determined in current context, or is impossible to be determined
         """
-        context = Container(**contextkw)
-        context._preprocessing = False
-        context._parsing = False
-        context._building = False
-        context._sizing = True
-        context._params = context
+        context = create_root_context(contextkw, sizing=True)
         return self._static_sizeof(context, "(static_sizeof)")
 
     def sizeof(self, obj: Container, **contextkw) -> int:
@@ -335,12 +337,7 @@ class Construct(object):
 
         :raises SizeofError: size could not be determined in current context, or is impossible to be determined
         """
-        context = Container(**contextkw)
-        context._preprocessing = False
-        context._parsing = False
-        context._building = False
-        context._sizing = True
-        context._params = context
+        context = create_root_context(contextkw, sizing=True)
         if isinstance(obj, dict) or isinstance(obj, Container):
             context.update(obj)
 
@@ -371,12 +368,7 @@ class Construct(object):
 
         :raises SizeofError: size could not be determined in current context, or is impossible to be determined
         """
-        context = Container(**contextkw)
-        context._preprocessing = False
-        context._parsing = False
-        context._building = False
-        context._sizing = True
-        context._params = context
+        context = create_root_context(contextkw, sizing=True)
         context.update(obj)
         return self._full_sizeof(obj, context, "(full_sizeof)")
 
@@ -426,6 +418,14 @@ class Construct(object):
         """ is used by Array to detect nested arrays (is a problem with Array of Array of simple type) """
         return False;
 
+    def _is_context_free(self) -> bool:
+        """ is used by Struct to detect fields that never look at or change the context when parsing, then no nested context is created for them """
+        return False
+
+    def _is_str_formatted(self) -> bool:
+        """ is used by Array to detect simple types whose _toET writes just str() of the value, then all elements are formatted at once """
+        return False
+
     def __rtruediv__(self, name):
         """
         Used for renaming subcons, usually part of a Struct, like Struct("index" / Byte).
@@ -458,17 +458,15 @@ class Construct(object):
         """
         Used for making Struct like ("index"/Byte + "prefix"/Byte).
         """
-        lhs = self.subcons  if isinstance(self,  Struct) else [self]
         rhs = other.subcons if isinstance(other, Struct) else [other]
-        return Struct(*(lhs + rhs))
+        return Struct(self, *rhs)
 
     def __rshift__(self, other):
         """
         Used for making Sequences like (Byte >> Short).
         """
-        lhs = self.subcons  if isinstance(self,  Sequence) else [self]
         rhs = other.subcons if isinstance(other, Sequence) else [other]
-        return Sequence(*(lhs + rhs))
+        return Sequence(self, *rhs)
 
     def __getitem__(self, count):
         """
@@ -487,18 +485,31 @@ class Subconstruct(Construct):
 
     :param subcon: Construct instance
     """
+    __slots__ = ("subcon", "_parsetarget")
+
     def __init__(self, subcon):
         if not isinstance(subcon, Construct):
             raise TypeError("subcon should be a Construct field")
         super().__init__()
         self.subcon = subcon
         self.flagbuildnone = subcon.flagbuildnone
+        # nested wrappers that just defer parsing to their subcon (e.g. Default, Rebuild) are skipped when parsing,
+        # so a chain of them is handled in a single call instead of one call per nesting level
+        target = subcon
+        while isinstance(target, Subconstruct) and type(target)._parse is Subconstruct._parse and target.parsed is None:
+            target = target._parsetarget
+        self._parsetarget = target
 
-    def __repr__(self):
-        return "<%s%s%s%s %s>" % (self.__class__.__name__, " "+self.name if self.name else "", " +nonbuild" if self.flagbuildnone else "", " +docs" if self.docs else "", repr(self.subcon), )
+    def _repr(self):
+        return f"<{self.__class__.__name__}{' '+self.name if self.name else ''}{' +nonbuild' if self.flagbuildnone else ''}{' +docs' if self.docs else ''} {self.subcon!r}>"
 
     def _parse(self, stream, context, path):
-        return self.subcon._parsereport(stream, context, path)
+        # same as self.subcon._parsereport, inlined to save a call per nesting level
+        subcon = self._parsetarget
+        obj = subcon._parse(stream, context, path)
+        if subcon.parsed is not None:
+            subcon.parsed(obj, context)
+        return obj
 
     def _preprocess(self, obj: Any, context: Container, path: str) -> Tuple[Any, Dict[str, Any]]:
         return self.subcon._preprocess(obj, context, path)
@@ -516,13 +527,69 @@ class Subconstruct(Construct):
         return self.subcon._full_sizeof(obj, context, path)
 
 
+class _UnavailableContext(Container):
+    """Used internally. Context that fails on every lookup, used to find out whether a computation depends on the context."""
+
+    def __getitem__(self, key):
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        raise KeyError(key)
+
+
 class Structconstruct(Construct):
+    # set by _make_plans if the size does not depend on the context
+    _static_size = None
+    # set by _make_plans to the constant size of each subcon, or None for the ones depending on the context
+    _static_sizes = None
+    # set by _make_plans if no subcon needs the context when parsing
+    _ctxfree = False
+
+    def _make_plans(self):
+        """Used internally. Caches names and bound methods of the subcons for the _parse and _build loops, so they are not
+        looked up per field, and the size if it is constant. The subcons are treated as fixed after construction."""
+        self._parse_plan = tuple((sc.name, sc._parsereport) for sc in self.subcons)
+        # Struct builds with a context that already holds the entries of the built object, so a field only has to be
+        # written to it before its build if it may be missing there (flagbuildnone), was overwritten by an earlier field
+        # of the same name, or is one of the reserved context entries
+        build_plan = []
+        seen = set()
+        for sc in self.subcons:
+            name = sc.name
+            prewrite = bool(name) and (sc.flagbuildnone or name in seen or name.startswith("_"))
+            seen.add(name)
+            build_plan.append((name, sc.flagbuildnone, prewrite, sc._build))
+        self._build_plan = tuple(build_plan)
+        # parsed hooks are called with the context, so those fields need it as well
+        self._ctxfree = all(sc.parsed is None and sc._is_context_free() for sc in self.subcons)
+        # most structs have a constant size, which is then computed only once. if any subcon looks at the context
+        # (or cannot compute a static size at all), it is left to _static_sizeof
+        static_sizes = []
+        for sc in self.subcons:
+            try:
+                static_sizes.append(sc._static_sizeof(_UnavailableContext(), ""))
+            except Exception:
+                static_sizes.append(None)
+        self._static_sizes = tuple(static_sizes)
+        self._static_size = None if None in static_sizes else sum(static_sizes)
+
     def _is_simple_type(self) -> bool:
         return False
 
+    def _is_context_free(self) -> bool:
+        return self._ctxfree
+
     def _static_sizeof(self, context: Container, path: str) -> int:
+        if self._static_size is not None:
+            return self._static_size
         try:
-            return sum(sc._static_sizeof(context, path) for sc in self.subcons)
+            size_sum = 0
+            for sc, static_size in zip(self.subcons, self._static_sizes or (None,) * len(self.subcons)):
+                size_sum += sc._static_sizeof(context, path) if static_size is None else static_size
+            return size_sum
         except (KeyError, AttributeError):
             raise SizeofError("cannot calculate size, key not found in context", path=path)
 
@@ -533,7 +600,10 @@ class Structconstruct(Construct):
             pass
         try:
             size_sum = 0
-            for sc in self.subcons:
+            for sc, static_size in zip(self.subcons, self._static_sizes or (None,) * len(self.subcons)):
+                if static_size is not None:
+                    size_sum += static_size
+                    continue
                 try:
                     size_sum += sc._static_sizeof(context, path)
                 except SizeofError:
@@ -561,15 +631,20 @@ class Arrayconstruct(Subconstruct):
         retlist = ListContainer()
         extra_info = {}
         for i, e in enumerate(obj):
-            context._index = i
+            context["_index"] = i
             child_obj, child_extra_info = self.subcon._preprocess(e, context, path)
             retlist.append(child_obj)
 
-            extra = {f"_{i}{k}": v for k, v in child_extra_info.items()}
-            extra_info.update(extra)
+            # only the entries of this element are added to the context, the earlier ones are already in it
+            prefix = f"_{i}"
+            for k, v in child_extra_info.items():
+                key = prefix + k
+                extra_info[key] = v
+                context[key] = v
 
+        # nested arrays write the same keys into the shared context, the entries of this array win in the end
+        if retlist:
             context.update(extra_info)
-
         return retlist, extra_info
 
     def _preprocess_size(self, obj: Any, context: Container, path: str, offset: int = 0) -> Tuple[Any, Dict[str, Any]]:
@@ -578,17 +653,23 @@ class Arrayconstruct(Subconstruct):
         extra_info = {"_offset": offset}
         size = 0
         for i, e in enumerate(obj):
-            context._index = i
+            context["_index"] = i
             child_obj, child_extra_info = self.subcon._preprocess_size(e, context, path, offset)
             retlist.append(child_obj)
 
-            extra = {f"_{i}{k}": v for k, v in child_extra_info.items()}
-            extra_info.update(extra)
+            # only the entries of this element are added to the context, the earlier ones are already in it
+            context["_offset"] = extra_info["_offset"]
+            prefix = f"_{i}"
+            for k, v in child_extra_info.items():
+                key = prefix + k
+                extra_info[key] = v
+                context[key] = v
             offset += child_extra_info["_size"]
             size += child_extra_info["_size"]
 
+        # nested arrays write the same keys into the shared context, the entries of this array win in the end
+        if retlist:
             context.update(extra_info)
-
         extra_info["_size"] = size
         extra_info["_endoffset"] = offset
 
@@ -598,28 +679,34 @@ class Arrayconstruct(Subconstruct):
         data = get_current_field(context, name)
 
         # Simple fields -> FormatFields and Strings
-        if self.subcon._is_simple_type() and not self.subcon._is_array():
+        if self.subcon._is_str_formatted():
+            # no element needs quoting, so this is what the csv writer in list_to_string would produce
+            parent.attrib[name] = "[" + ",".join(map(str, data)) + "]"
+        elif self.subcon._is_simple_type() and not self.subcon._is_array():
             arr = []
+            # one context for all elements, only the index and the entry of the current element change
+            ctx = create_parent_context(context)
             for idx, item in enumerate(data):
-                # create new context including the index
-                ctx = create_parent_context(context)
-                ctx._index = idx
-                ctx[f"{name}_{idx}"] = data[idx]
+                key = f"{name}_{idx}"
+                ctx["_index"] = idx
+                ctx[key] = item
 
-                obj = self.subcon._toET(None, name, ctx, path)
-                arr += [obj]
+                arr.append(self.subcon._toET(None, name, ctx, path))
+                ctx.pop(key, None)
             parent.attrib[name] = "[" + list_to_string(arr) + "]"
         else:
             sc_names = self.subcon._names()
             if len(sc_names) == 0:
                 sc_names = [self.subcon.__class__.__name__]
+            # one context for all elements, only the index and the entry of the current element change
+            ctx = create_parent_context(context)
             for idx, item in enumerate(data):
-                # create new context including the index
-                ctx = create_parent_context(context)
-                ctx._index = idx
-                ctx[f"{sc_names[0]}_{idx}"] = data[idx]
+                key = f"{sc_names[0]}_{idx}"
+                ctx["_index"] = idx
+                ctx[key] = item
 
                 elem = self.subcon._toET(parent, sc_names[0], ctx, path)
+                ctx.pop(key, None)
                 if elem is not None:
                     parent.append(elem)
 
@@ -670,14 +757,23 @@ class Arrayconstruct(Subconstruct):
             sum_size += self.subcon._sizeof(e, context, path)
         return sum_size
 
+    # _is_simple_type and _names are asked for every element by the XML methods of enclosing constructs, the results only
+    # depend on the subcon tree, so they are computed on first use (not in __init__, LazyBound may not be resolvable yet)
+    _cached_is_simple_type = None
+    _cached_names = None
+
     def _is_simple_type(self) -> bool:
-        return self.subcon._is_simple_type()
+        if self._cached_is_simple_type is None:
+            self._cached_is_simple_type = self.subcon._is_simple_type()
+        return self._cached_is_simple_type
 
     def _is_array(self) -> bool:
         return True
 
     def _names(self) -> list[int]:
-        return self.subcon._names()
+        if self._cached_names is None:
+            self._cached_names = self.subcon._names()
+        return self._cached_names
 
 
 class Adapter(Subconstruct):
@@ -688,9 +784,14 @@ class Adapter(Subconstruct):
 
     :param subcon: Construct instance
     """
+    __slots__ = ()
 
     def _parse(self, stream, context, path):
-        obj = self.subcon._parsereport(stream, context, path)
+        # same as self.subcon._parsereport, inlined to save a call per adapter
+        subcon = self._parsetarget
+        obj = subcon._parse(stream, context, path)
+        if subcon.parsed is not None:
+            subcon.parsed(obj, context)
         return self._decode(obj, context, path)
 
     def _build(self, obj, stream, context, path):
@@ -718,6 +819,19 @@ class SymmetricAdapter(Adapter):
 
     :param subcon: Construct instance
     """
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # subclasses that only implement _decode get it bound as _encode too, so building skips the forwarding call.
+        # only done if the inherited _encode is the forwarding one or such an alias, an explicit _encode of an
+        # intermediate class is kept
+        if "_decode" in cls.__dict__ and "_encode" not in cls.__dict__:
+            owner = next(klass for klass in cls.__mro__ if "_encode" in klass.__dict__)
+            if owner is SymmetricAdapter or owner.__dict__.get("_encode_aliased", False):
+                cls._encode = cls._decode
+                cls._encode_aliased = True
+
     def _encode(self, obj, context, path):
         return self._decode(obj, context, path)
 
@@ -748,7 +862,11 @@ class Tunnel(Subconstruct):
     def _parse(self, stream, context, path):
         data = stream_read_entire(stream, path)  # reads entire stream
         data = self._decode(data, context, path)
-        return self.subcon.parse(data, **context)
+        # parse with the current context directly, instead of copying it into a new top level context
+        try:
+            return self.subcon._parsereport(io.BytesIO(data), context, path)
+        except CancelParsing:
+            pass
 
     def _build(self, obj, stream, context, path):
         stream2 = io.BytesIO()
@@ -814,35 +932,53 @@ class Bytes(Construct):
         dingsda.core.SizeofError: cannot calculate size, key not found in context
     """
 
+    __slots__ = ("length", "_length_callable")
+
     def __init__(self, length):
         super().__init__()
         self.length = length
+        # resolved once, instead of calling callable() on every parse and build
+        self._length_callable = callable(length)
 
     def _parse(self, stream, context, path):
-        length = self.length(context) if callable(self.length) else self.length
+        length = self.length(context) if self._length_callable else self.length
         return stream_read(stream, length, path)
 
     def _build(self, obj, stream, context, path):
-        length = self.length(context) if callable(self.length) else self.length
-        data = integer2bytes(obj, length) if isinstance(obj, int) else obj
-        data = bytes(data) if type(data) is bytearray else data
+        length = self.length(context) if self._length_callable else self.length
+        # bytes is by far the most common input, so only a single type check is done for it
+        if type(obj) is bytes:
+            data = obj
+        elif isinstance(obj, int):
+            data = integer2bytes(obj, length)
+        elif type(obj) is bytearray:
+            data = bytes(obj)
+        else:
+            data = obj
         stream_write(stream, data, length, path)
         return data
 
     def _static_sizeof(self, context: Container, path: str) -> int:
+        if not self._length_callable:
+            return self.length
         try:
-            return evaluate(self.length, context)
+            return self.length(context)
         except (KeyError, AttributeError):
             raise SizeofError("cannot calculate size, key not found in context", path=path)
 
     def _sizeof(self, obj: Any, context: Container, path: str) -> int:
         # FIXME: this should use not the length field but the actual data
         # FIXME: add preprocess so the length field can be rebuild from the length of the actual data
+        if not self._length_callable:
+            return self.length
         try:
-            return evaluate(self.length, context)
+            return self.length(context)
         except (KeyError, AttributeError):
             raise SizeofError("cannot calculate size, key not found in context", path=path)
 
+    def _is_context_free(self) -> bool:
+        return not self._length_callable
+
     def _toET(self, parent, name, context, path):
         assert (name is not None)
 
@@ -864,7 +1000,11 @@ class Bytes(Construct):
         else:
             elem = parent.attrib[name]
 
-        elem = b"".fromhex(elem)
+        # a2b_hex is considerably faster than bytes.fromhex, but does not accept whitespace
+        try:
+            elem = binascii.a2b_hex(elem)
+        except (binascii.Error, ValueError):
+            elem = bytes.fromhex(elem)
         insert_or_append_field(context, name, elem)
         return context
 
@@ -924,7 +1064,11 @@ class GreedyBytes(Construct):
         else:
             elem = parent.attrib[name]
 
-        elem = b"".fromhex(elem)
+        # a2b_hex is considerably faster than bytes.fromhex, but does not accept whitespace
+        try:
+            elem = binascii.a2b_hex(elem)
+        except (binascii.Error, ValueError):
+            elem = bytes.fromhex(elem)
         insert_or_append_field(context, name, elem)
         return context
 
@@ -1027,7 +1171,11 @@ class Flag(Construct):
         return stream_read(stream, 1, path) != b"\x00"
 
     def _build(self, obj, stream, context, path):
-        stream_write(stream, b"\x01" if obj else b"\x00", 1, path)
+        # inlined stream_write for in-memory streams
+        if type(stream) is io.BytesIO:
+            stream.write(b"\x01" if obj else b"\x00")
+        else:
+            stream_write(stream, b"\x01" if obj else b"\x00", 1, path)
         return obj
 
     def _static_sizeof(self, context: Container, path: str) -> int:
@@ -1038,8 +1186,20 @@ class EnumInteger(int):
     pass
 
 
+class EnumDecodeMapping(dict):
+    """Used internally. Values without a label are returned as EnumInteger, instead of raising KeyError."""
+
+    def __missing__(self, key):
+        return EnumInteger(key)
+
+
 class EnumIntegerString(str):
     """Used internally."""
+    # a slot instead of a per-label __dict__
+    __slots__ = ("intvalue",)
+
+    def __reduce__(self):
+        return (EnumIntegerString.new, (self.intvalue, str(self)))
 
     def __repr__(self):
         return "EnumIntegerString.new(%s, %s)" % (self.intvalue, str.__repr__(self), )
@@ -1103,8 +1263,18 @@ class Enum(Adapter):
         for enum in merge:
             for enumentry in enum:
                 mapping[enumentry.name] = enumentry.value
-        self.encmapping = {EnumIntegerString.new(v, k): v for k, v in mapping.items()}
-        self.decmapping = {v: EnumIntegerString.new(v, k) for k, v in mapping.items()}
+        # one label instance per entry, shared by both mappings
+        self.encmapping = {}
+        self.decmapping = EnumDecodeMapping()
+        for k, v in mapping.items():
+            label = EnumIntegerString.new(v, k)
+            self.encmapping[label] = v
+            self.decmapping[v] = label
+        # labels are set as instance attributes, so d.label is a plain attribute lookup. labels which collide with an
+        # attribute or method keep resolving to that, as with __getattr__
+        for label, v in self.encmapping.items():
+            if label not in self.__dict__ and not hasattr(type(self), label):
+                self.__dict__[label] = self.decmapping[v]
 
     def __getattr__(self, name):
         if name in self.encmapping:
@@ -1112,10 +1282,9 @@ class Enum(Adapter):
         raise AttributeError
 
     def _decode(self, obj, context, path):
-        try:
-            return self.decmapping[obj]
-        except KeyError:
-            return EnumInteger(obj)
+        # in Python code a list indexed by value is not faster than this dict lookup, the only thing to avoid is raising and
+        # catching KeyError for unknown values, which EnumDecodeMapping handles
+        return self.decmapping[obj]
 
     def _encode(self, obj, context, path):
         try:
@@ -1151,6 +1320,7 @@ class Enum(Adapter):
 
 class BitwisableString(str):
     """Used internally."""
+    __slots__ = ()
 
     # def __repr__(self):
     #     return "BitwisableString(%s)" % (str.__repr__(self), )
@@ -1198,6 +1368,8 @@ class FlagsEnum(Adapter):
         FlagsEnum(Byte, E) <--> FlagsEnum(Byte, one=1, two=2)
     """
 
+    _ENCODECACHE_SIZE = 1024
+
     def __init__(self, subcon, *merge, **flags):
         super().__init__(subcon)
         for enum in merge:
@@ -1205,6 +1377,16 @@ class FlagsEnum(Adapter):
                 flags[enumentry.name] = enumentry.value
         self.flags = flags
         self.reverseflags = {v:k for k,v in flags.items()}
+        # the labels are created once, not on every parse
+        self._flagitems = tuple((BitwisableString(name), value) for name,value in flags.items())
+        # parsed Containers are copied from this one, so only the set flags have to be written
+        self._decodetemplate = Container([("_flagsenum", True)] + [(name, False) for name,value in self._flagitems])
+        # labels as instance attributes, see Enum
+        for name, value in self._flagitems:
+            if name not in self.__dict__ and not hasattr(type(self), name):
+                self.__dict__[name] = name
+        # values of already built label strings like "one|two", bounded by _ENCODECACHE_SIZE
+        self._encodecache = {}
 
     def __getattr__(self, name):
         if name in self.flags:
@@ -1212,22 +1394,27 @@ class FlagsEnum(Adapter):
         raise AttributeError
 
     def _decode(self, obj, context, path):
-        obj2 = Container()
-        obj2._flagsenum = True
-        for name,value in self.flags.items():
-            obj2[BitwisableString(name)] = (obj & value == value)
-        return obj2
+        ret = Container(self._decodetemplate)
+        for name,value in self._flagitems:
+            if obj & value == value:
+                ret[name] = True
+        return ret
 
     def _encode(self, obj, context, path):
         try:
             if isinstance(obj, integertypes):
                 return obj
             if isinstance(obj, stringtypes):
+                flags = self._encodecache.get(obj)
+                if flags is not None:
+                    return flags
                 flags = 0
                 for name in obj.split("|"):
                     name = name.strip()
                     if name:
                         flags |= self.flags[name] # KeyError
+                if len(self._encodecache) < self._ENCODECACHE_SIZE:
+                    self._encodecache[obj] = flags
                 return flags
             if isinstance(obj, dict):
                 flags = 0
@@ -1345,31 +1532,49 @@ class Struct(Structconstruct):
         self.subcons = list(subcons) + list(k/v for k,v in subconskw.items())
         self._subcons = Container((sc.name,sc) for sc in self.subcons if sc.name)
         self.flagbuildnone = all(sc.flagbuildnone for sc in self.subcons)
+        self._make_plans()
 
     def __getattr__(self, name):
         if name in self._subcons:
             return self._subcons[name]
         raise AttributeError
 
+    def __add__(self, other):
+        """
+        Used for making Struct like ("index"/Byte + "prefix"/Byte), extends the subcons of this Struct.
+        """
+        rhs = other.subcons if isinstance(other, Struct) else [other]
+        return Struct(*self.subcons, *rhs)
+
     def _parse(self, stream, context, path):
         obj = Container()
-        obj._io = stream
+        obj["_io"] = stream
+        if self._ctxfree:
+            # none of the fields looks at the context, so the nested context and root update are left out
+            for name, parsereport in self._parse_plan:
+                subobj = parsereport(stream, context, path)
+                if name:
+                    obj[name] = subobj
+            return obj
         ctx = create_child_context(context, obj)
         ctx["_subcons"] = self._subcons
-        for sc in self.subcons:
-            try:
-                subobj = sc._parsereport(stream, ctx, path)
-                if sc.name:
-                    obj[sc.name] = subobj
-                    ctx[sc.name] = subobj
-
-                # this adds the objects to the root of the context, if this struct is the root
-                if context.get("_root", None) is None:
-                    ctx["_root"].update(obj)
+        # this adds the objects to the root of the context, if this struct is the root. it happens only after the first
+        # field, because the update also copies a _root entry into the root context, so it is checked once up front.
+        # ctx already holds every entry of obj, so only ctx needs to be copied.
+        updateroot = context.get("_root", None) is None
+        try:
+            for name, parsereport in self._parse_plan:
+                subobj = parsereport(stream, ctx, path)
+                if name:
+                    obj[name] = subobj
+                    ctx[name] = subobj
+
+                if updateroot:
                     ctx["_root"].update(ctx)
+                    updateroot = False
 
-            except StopFieldError:
-                break
+        except StopFieldError:
+            pass
 
         return obj
 
@@ -1440,21 +1645,21 @@ class Struct(Structconstruct):
 
         ctx = create_child_context(context, obj)
         ctx["_subcons"] = self._subcons
-        for sc in self.subcons:
-            try:
-                if sc.flagbuildnone:
-                    subobj = obj.get(sc.name, None)
+        try:
+            for name, flagbuildnone, prewrite, build in self._build_plan:
+                if flagbuildnone:
+                    subobj = obj.get(name, None)
                 else:
-                    subobj = obj[sc.name] # raises KeyError
+                    subobj = obj[name] # raises KeyError
 
-                if sc.name:
-                    ctx[sc.name] = subobj
+                if prewrite:
+                    ctx[name] = subobj
 
-                buildret = sc._build(subobj, stream, ctx, path)
-                if sc.name:
-                    ctx[sc.name] = buildret
-            except StopFieldError:
-                break
+                buildret = build(subobj, stream, ctx, path)
+                if name and buildret is not subobj:
+                    ctx[name] = buildret
+        except StopFieldError:
+            pass
         return ctx
 
     def _toET(self, parent, name, context, path):
@@ -1490,6 +1695,9 @@ class Struct(Structconstruct):
         assert(elem is not None)
 
         for sc in self.subcons:
+            # Pass does not touch the context, skip the call
+            if sc is Pass:
+                continue
             ctx = sc._fromET(context=ctx, parent=elem, name=sc.name, path=f"{path} -> {name}")
 
         # remove _, because rebuild will fail otherwise
@@ -1554,46 +1762,58 @@ class Sequence(Structconstruct):
         self.subcons = list(subcons) + list(k/v for k,v in subconskw.items())
         self._subcons = Container((sc.name,sc) for sc in self.subcons if sc.name)
         self.flagbuildnone = all(sc.flagbuildnone for sc in self.subcons)
+        self._make_plans()
 
     def __getattr__(self, name):
         if name in self._subcons:
             return self._subcons[name]
         raise AttributeError
 
+    def __rshift__(self, other):
+        """
+        Used for making Sequences like (Byte >> Short), extends the subcons of this Sequence.
+        """
+        rhs = other.subcons if isinstance(other, Sequence) else [other]
+        return Sequence(*self.subcons, *rhs)
+
     def _parse(self, stream, context, path):
+        if self._ctxfree:
+            # StopIf is never context free, so no field can end the sequence early here
+            return ListContainer([parsereport(stream, context, path) for name, parsereport in self._parse_plan])
         obj = ListContainer()
-        context = Container(_ = context, _params = context._params, _root = None, _parsing = context._parsing, _building = context._building, _sizing = context._sizing, _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
-        context._root = context._.get("_root", context)
-        for sc in self.subcons:
-            try:
-                subobj = sc._parsereport(stream, context, path)
+        # item access instead of attribute access, Container.__getattr__ is implemented in Python
+        context = Container(_ = context, _params = context["_params"], _root = None, _parsing = context["_parsing"], _building = context["_building"], _sizing = context["_sizing"], _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
+        context["_root"] = context["_"].get("_root", context)
+        try:
+            for name, parsereport in self._parse_plan:
+                subobj = parsereport(stream, context, path)
                 obj.append(subobj)
-                if sc.name:
-                    context[sc.name] = subobj
-            except StopFieldError:
-                break
+                if name:
+                    context[name] = subobj
+        except StopFieldError:
+            pass
         return obj
 
     def _build(self, obj, stream, context, path):
         if obj is None:
             obj = ListContainer([None for sc in self.subcons])
-        context = Container(_ = context, _params = context._params, _root = None, _parsing = context._parsing, _building = context._building, _sizing = context._sizing, _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
-        context._root = context._.get("_root", context)
+        context = Container(_ = context, _params = context["_params"], _root = None, _parsing = context["_parsing"], _building = context["_building"], _sizing = context["_sizing"], _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
+        context["_root"] = context["_"].get("_root", context)
         objiter = iter(obj)
         retlist = ListContainer()
-        for i,sc in enumerate(self.subcons):
-            try:
+        try:
+            for name, _, _, build in self._build_plan:
                 subobj = next(objiter)
-                if sc.name:
-                    context[sc.name] = subobj
+                if name:
+                    context[name] = subobj
 
-                buildret = sc._build(subobj, stream, context, path)
+                buildret = build(subobj, stream, context, path)
                 retlist.append(buildret)
 
-                if sc.name:
-                    context[sc.name] = buildret
-            except StopFieldError:
-                break
+                if name:
+                    context[name] = buildret
+        except StopFieldError:
+            pass
         return retlist
 
     def _preprocess(self, obj: Any, context: Container, path: str) -> Tuple[Any, Dict[str, Any]]:
@@ -1637,18 +1857,51 @@ class Array(Arrayconstruct):
         super().__init__(subcon)
         self.count = count
         self.discard = discard
+        # the size of arrays with a constant count of constant size elements is computed only once, as in Struct.
+        # count and subcon are treated as fixed after construction
+        self._static_size = None
+        if isinstance(count, int):
+            try:
+                self._static_size = count * subcon._static_sizeof(_UnavailableContext(), "")
+            except Exception:
+                pass
 
     def _parse(self, stream, context, path):
         count = evaluate(self.count, context)
         if not 0 <= count:
             raise RangeError("invalid count %s" % (count,), path=path)
         discard = self.discard
+        subcon = self.subcon
+        if subcon._parse_batch is not None and subcon.parsed is None:
+            # if the batch fails, e.g. because the stream ends inside the array, the elements are parsed again one by
+            # one below, so the error is raised by the failing element with _index set to it
+            try:
+                fallback = stream.tell()
+            except Exception:
+                fallback = None
+            try:
+                obj = subcon._parse_batch(stream, count, context, path)
+            except ConstructError:
+                if fallback is None:
+                    raise
+                stream_seek(stream, fallback, 0, path)
+            else:
+                # _index is left at the last element, as by the loop
+                if count:
+                    context["_index"] = count - 1
+                return ListContainer() if discard else ListContainer(obj)
+        # loop invariant lookups are bound once, item access avoids the Python level Container.__setattr__
+        parsereport = subcon._parsereport
         obj = ListContainer()
-        for i in range(count):
-            context._index = i
-            e = self.subcon._parsereport(stream, context, path)
-            if not discard:
-                obj.append(e)
+        if discard:
+            for i in range(count):
+                context["_index"] = i
+                parsereport(stream, context, path)
+        else:
+            append = obj.append
+            for i in range(count):
+                context["_index"] = i
+                append(parsereport(stream, context, path))
         return obj
 
     def _build(self, obj, stream, context, path):
@@ -1658,15 +1911,28 @@ class Array(Arrayconstruct):
         if not len(obj) == count:
             raise RangeError("expected %d elements, found %d" % (count, len(obj)), path=path)
         discard = self.discard
+        subcon = self.subcon
+        # the batch returns False for values it cannot pack, those are built one by one below, which reports the error
+        if subcon._build_batch is not None and subcon._build_batch(obj, stream, context, path):
+            if count:
+                context["_index"] = count - 1
+            return ListContainer() if discard else ListContainer(obj)
+        build = subcon._build
         retlist = ListContainer()
-        for i,e in enumerate(obj):
-            context._index = i
-            buildret = self.subcon._build(e, stream, context, path)
-            if not discard:
-                retlist.append(buildret)
+        if discard:
+            for i,e in enumerate(obj):
+                context["_index"] = i
+                build(e, stream, context, path)
+        else:
+            append = retlist.append
+            for i,e in enumerate(obj):
+                context["_index"] = i
+                append(build(e, stream, context, path))
         return retlist
 
     def _static_sizeof(self, context: Container, path: str) -> int:
+        if self._static_size is not None:
+            return self._static_size
         try:
             count = evaluate(self.count, context, recurse=True)
         except (KeyError, AttributeError):
@@ -1708,14 +1974,20 @@ class GreedyRange(Subconstruct):
         retlist = ListContainer()
         extra_info = {}
         for i,e in enumerate(obj):
-            context._index = i
+            context["_index"] = i
             obj, child_extra_info = self.subcon._preprocess(e, context, path)
             retlist.append(obj)
 
-            extra = {f"_{i}{k}": v for k, v in child_extra_info.items()}
-            extra_info.update(extra)
-            context.update(extra_info)
+            # only the entries of this element are added to the context, the earlier ones are already in it
+            prefix = f"_{i}"
+            for k, v in child_extra_info.items():
+                key = prefix + k
+                extra_info[key] = v
+                context[key] = v
 
+        # nested arrays write the same keys into the shared context, the entries of this range win in the end
+        if retlist:
+            context.update(extra_info)
         return retlist, extra_info
 
     def _preprocess_size(self, obj: Any, context: Container, path: str, offset: int = 0) -> Tuple[Any, Dict[str, Any]]:
@@ -1724,17 +1996,23 @@ class GreedyRange(Subconstruct):
         extra_info = {"_offset": offset}
         size = 0
         for i,e in enumerate(obj):
-            context._index = i
+            context["_index"] = i
             obj, child_extra_info = self.subcon._preprocess_size(e, context, path, offset)
             retlist.append(obj)
 
-            extra = {f"_{i}{k}": v for k, v in child_extra_info.items()}
-            extra_info.update(extra)
+            # only the entries of this element are added to the context, the earlier ones are already in it
+            context["_offset"] = extra_info["_offset"]
+            prefix = f"_{i}"
+            for k, v in child_extra_info.items():
+                key = prefix + k
+                extra_info[key] = v
+                context[key] = v
             offset += child_extra_info["_size"]
             size += child_extra_info["_size"]
 
+        # nested arrays write the same keys into the shared context, the entries of this range win in the end
+        if retlist:
             context.update(extra_info)
-
         extra_info["_size"] = size
         extra_info["_endoffset"] = offset
 
@@ -1742,14 +2020,28 @@ class GreedyRange(Subconstruct):
 
     def _parse(self, stream, context, path):
         discard = self.discard
+        parsereport = self.subcon._parsereport
         obj = ListContainer()
+        append = obj.append
+        if type(stream) is io.BytesIO:
+            # tell cannot fail on in-memory streams, and the end is known, so parsing stops there without an exception
+            tell = stream.tell
+            # seeking to the end instead of getbuffer(), which would copy a buffer still shared with the parsed bytes
+            pos = tell()
+            end = stream.seek(0, 2)
+            stream.seek(pos)
+        else:
+            tell = lambda: stream_tell(stream, path)
+            end = None
         try:
             for i in itertools.count():
-                context._index = i
-                fallback = stream_tell(stream, path)
-                e = self.subcon._parsereport(stream, context, path)
+                context["_index"] = i
+                fallback = tell()
+                if fallback == end:
+                    break
+                e = parsereport(stream, context, path)
                 if not discard:
-                    obj.append(e)
+                    append(e)
         except StopFieldError:
             pass
         except ExplicitError:
@@ -1760,13 +2052,18 @@ class GreedyRange(Subconstruct):
 
     def _build(self, obj, stream, context, path):
         discard = self.discard
+        build = self.subcon._build
         try:
             retlist = ListContainer()
-            for i,e in enumerate(obj):
-                context._index = i
-                buildret = self.subcon._build(e, stream, context, path)
-                if not discard:
-                    retlist.append(buildret)
+            if discard:
+                for i,e in enumerate(obj):
+                    context["_index"] = i
+                    build(e, stream, context, path)
+            else:
+                append = retlist.append
+                for i,e in enumerate(obj):
+                    context["_index"] = i
+                    append(build(e, stream, context, path))
             return retlist
         except StopFieldError:
             pass
@@ -1775,6 +2072,11 @@ class GreedyRange(Subconstruct):
         raise SizeofError("GreedyRange cannot calculate size statically", path)
 
 
+def _constant_predicate(value, obj, lst, context):
+    """Used internally by RepeatUntil, for predicates given as a constant. A module level function, so it can be pickled."""
+    return value
+
+
 class RepeatUntil(Arrayconstruct):
     r"""
     Homogenous array of elements, similar to C# generic IEnumerable<T>, that repeats until the predicate indicates it to stop. Note that the last element (that predicate indicated as True) is included in the return list.
@@ -1809,44 +2111,59 @@ class RepeatUntil(Arrayconstruct):
         self.predicate = predicate
         self.discard = discard
         self.check_predicate = check_predicate
+        # constant predicates are wrapped once here, not on every parse and build
+        self._predicate = predicate if callable(predicate) else functools.partial(_constant_predicate, predicate)
 
     def _parse(self, stream, context, path):
-        predicate = self.predicate
+        predicate = self._predicate
         discard = self.discard
-        if not callable(predicate):
-            predicate = lambda _1,_2,_3: predicate
+        parsereport = self.subcon._parsereport
+        # the predicate gets the list parsed so far, so it is a ListContainer from the start
         obj = ListContainer()
+        append = obj.append
         for i in itertools.count():
-            context._index = i
-            e = self.subcon._parsereport(stream, context, path)
+            context["_index"] = i
+            e = parsereport(stream, context, path)
             if not discard:
-                obj.append(e)
+                append(e)
             if predicate(e, obj, context):
                 return obj
 
     def _build(self, obj, stream, context, path):
-        predicate = self.predicate
         discard = self.discard
-        if not callable(predicate):
-            predicate = lambda _1,_2,_3: predicate
-        partiallist = ListContainer()
+        build = self.subcon._build
         retlist = ListContainer()
+        append = retlist.append
+        if not self.check_predicate:
+            # every element is built, there is no predicate to match
+            if discard:
+                for i,e in enumerate(obj):
+                    context["_index"] = i
+                    build(e, stream, context, path)
+            else:
+                for i,e in enumerate(obj):
+                    context["_index"] = i
+                    append(build(e, stream, context, path))
+            return retlist
+        predicate = self._predicate
+        partiallist = ListContainer()
+        partialappend = partiallist.append
         for i,e in enumerate(obj):
-            context._index = i
-            buildret = self.subcon._build(e, stream, context, path)
+            context["_index"] = i
+            buildret = build(e, stream, context, path)
             if not discard:
-                retlist.append(buildret)
-                partiallist.append(buildret)
-            if self.check_predicate and predicate(e, partiallist, context):
+                append(buildret)
+                partialappend(buildret)
+            if predicate(e, partiallist, context):
                 break
         else:
             raise RepeatError("expected any item to match predicate, when building", path=path)
         return retlist
 
     def _names(self):
-        sc_names = [self.name]
-        sc_names += self.subcon._names()
-        return sc_names
+        if self._cached_names is None:
+            self._cached_names = [self.name] + self.subcon._names()
+        return self._cached_names
 
     def _static_sizeof(self, context: Container, path: str) -> int:
         raise SizeofError("cannot calculate size of RepeatUntil", path=path)
@@ -1901,12 +2218,13 @@ class Area(Arrayconstruct):
         extra_info = {"_offset": offset, "_size": 0, "_endoffset": offset}
         ptrsize = 0
         for i, e in enumerate(obj):
-            context._index = i
+            context["_index"] = i
             obj, child_extra_info = self.subcon._preprocess_size(e, context, path, offset)
             retlist.append(obj)
 
-            extra = {f"_ptr_{i}{k}": v for k, v in child_extra_info.items()}
-            extra_info.update(extra)
+            prefix = f"_ptr_{i}"
+            for k, v in child_extra_info.items():
+                extra_info[prefix + k] = v
             ptrsize += child_extra_info["_size"]
 
             #context.update(extra_info)
@@ -1996,27 +2314,33 @@ class Renamed(Subconstruct):
     def __init__(self, subcon, newname=None, newdocs=None, newparsed=None):
         super().__init__(subcon)
         self.name = newname if newname else subcon.name
+        # interned, so the dict lookups with the name in Struct and the context mostly compare by identity. str subclasses
+        # (e.g. Enum labels) cannot be interned and are kept as they are
+        if type(self.name) is str:
+            self.name = sys.intern(self.name)
         self.docs = newdocs if newdocs else subcon.docs
         self.parsed = newparsed if newparsed else subcon.parsed
+        # appended to the path on every parse, build and preprocess, so it is formatted only once
+        self._pathsuffix = " -> %s" % (self.name,)
 
     def __getattr__(self, name):
         return getattr(self.subcon, name)
 
+    # the batch methods of the subcon are used as is, so e.g. Array(n, "x"/Int32ub) is still unpacked at once
+    _parse_batch = property(lambda self: self.subcon._parse_batch)
+    _build_batch = property(lambda self: self.subcon._build_batch)
+
     def _parse(self, stream, context, path):
-        path += " -> %s" % (self.name,)
-        return self.subcon._parsereport(stream, context, path)
+        return self.subcon._parsereport(stream, context, path + self._pathsuffix)
 
     def _preprocess(self, obj: Any, context: Container, path: str) -> Tuple[Any, Dict[str, Any]]:
-        path += " -> %s" % (self.name,)
-        return self.subcon._preprocess(obj, context, path)
+        return self.subcon._preprocess(obj, context, path + self._pathsuffix)
 
     def _preprocess_size(self, obj: Any, context: Container, path: str, offset: int = 0) -> Tuple[Any, Dict[str, Any]]:
-        path += " -> %s" % (self.name,)
-        return self.subcon._preprocess_size(obj=obj, context=context, path=path, offset=offset)
+        return self.subcon._preprocess_size(obj=obj, context=context, path=path + self._pathsuffix, offset=offset)
 
     def _build(self, obj, stream, context, path):
-        path += " -> %s" % (self.name,)
-        return self.subcon._build(obj, stream, context, path)
+        return self.subcon._build(obj, stream, context, path + self._pathsuffix)
 
     def _toET(self, parent, name, context, path):
         ctx = context
@@ -2047,16 +2371,25 @@ class Renamed(Subconstruct):
 
         return ctx
 
+    # cached on first use, see Arrayconstruct
+    _cached_is_simple_type = None
+    _cached_names = None
+
     def _is_simple_type(self):
-        return self.subcon._is_simple_type()
+        if self._cached_is_simple_type is None:
+            self._cached_is_simple_type = self.subcon._is_simple_type()
+        return self._cached_is_simple_type
 
     def _is_array(self):
         return self.subcon._is_array()
 
+    def _is_context_free(self):
+        return self.subcon.parsed is None and self.subcon._is_context_free()
+
     def _names(self):
-        sc_names = [self.name]
-        sc_names += self.subcon._names()
-        return sc_names
+        if self._cached_names is None:
+            self._cached_names = [self.name] + self.subcon._names()
+        return self._cached_names
 
 
 #===============================================================================
@@ -2095,19 +2428,29 @@ class Const(Subconstruct):
             if not isinstance(value, bytestringtype):
                 raise StringError(f"given non-bytes value {repr(value)}, perhaps unicode?")
             subcon = Bytes(len(value))
+            # signatures given as bytes literal are read and written directly, without going through the Bytes subcon
+            self._length = len(value)
+        else:
+            self._length = None
         super().__init__(subcon)
         self.value = value
         self.flagbuildnone = True
 
     def _parse(self, stream, context, path):
-        obj = self.subcon._parsereport(stream, context, path)
+        if self._length is not None:
+            obj = stream_read(stream, self._length, path)
+        else:
+            obj = self.subcon._parsereport(stream, context, path)
         if not obj == self.value:
             raise ConstError(f"parsing expected {repr(self.value)} but parsed {repr(obj)}", path=path)
         return obj
 
     def _build(self, obj, stream, context, path):
-        if obj not in (None, self.value):
+        if obj is not None and obj != self.value:
             raise ConstError(f"building expected None or {repr(self.value)} but got {repr(obj)}", path=path)
+        if self._length is not None:
+            stream_write(stream, self.value, self._length, path)
+            return self.value
         return self.subcon._build(self.value, stream, context, path)
 
     def _toET(self, parent, name, context, path):
@@ -2158,12 +2501,14 @@ class Computed(Construct):
         super().__init__()
         self.func = func
         self.flagbuildnone = True
+        # checked once, as in Bytes
+        self._func_callable = callable(func)
 
     def _parse(self, stream, context, path):
-        return evaluate(self.func, context)
+        return self.func(context) if self._func_callable else self.func
 
     def _build(self, obj, stream, context, path):
-        return evaluate(self.func, context)
+        return self.func(context) if self._func_callable else self.func
 
     def _preprocess(self, obj: Any, context: Container, path: str) -> Tuple[Any, Dict[str, Any]]:
         return self.func, {}
@@ -2211,10 +2556,17 @@ class Index(Construct):
         self.flagbuildnone = True
 
     def _parse(self, stream, context, path):
-        return context.get("_index", None)
+        # repeaters always set _index, item access is cheaper than get() when the key is there
+        try:
+            return context["_index"]
+        except KeyError:
+            return None
 
     def _build(self, obj, stream, context, path):
-        return context.get("_index", None)
+        try:
+            return context["_index"]
+        except KeyError:
+            return None
 
     def _static_sizeof(self, context: Container, path: str) -> int:
         return 0
@@ -2255,9 +2607,10 @@ class Rebuild(Subconstruct):
         super().__init__(subcon)
         self.func = func
         self.flagbuildnone = True
+        self._func_callable = callable(func)
 
     def _build(self, obj, stream, context, path):
-        obj = evaluate(self.func, context)
+        obj = self.func(context) if self._func_callable else self.func
         return self.subcon._build(obj, stream, context, path)
 
     def _preprocess(self, obj: Any, context: Container, path: str) -> Tuple[Any, Dict[str, Any]]:
@@ -2320,9 +2673,11 @@ class Default(Subconstruct):
         super().__init__(subcon)
         self.value = value
         self.flagbuildnone = True
+        self._value_callable = callable(value)
 
     def _build(self, obj, stream, context, path):
-        obj = evaluate(self.value, context) if obj is None else obj
+        if obj is None:
+            obj = self.value(context) if self._value_callable else self.value
         return self.subcon._build(obj, stream, context, path)
 
     def _toET(self, parent, name, context, path):
@@ -2354,14 +2709,15 @@ class Check(Construct):
         super().__init__()
         self.func = func
         self.flagbuildnone = True
+        self._func_callable = callable(func)
 
     def _parse(self, stream, context, path):
-        passed = evaluate(self.func, context)
+        passed = self.func(context) if self._func_callable else self.func
         if not passed:
             raise CheckError("check failed during parsing", path=path)
 
     def _build(self, obj, stream, context, path):
-        passed = evaluate(self.func, context)
+        passed = self.func(context) if self._func_callable else self.func
         if not passed:
             raise CheckError("check failed during building", path=path)
 
@@ -2462,61 +2818,82 @@ class FocusedSeq(Construct):
         self.parsebuildfrom = parsebuildfrom
         self.subcons = list(subcons) + list(k/v for k,v in subconskw.items())
         self._subcons = Container((sc.name,sc) for sc in self.subcons if sc.name)
+        # a constant parsebuildfrom is resolved once, context lambdas are still looked up on every call. every subcon
+        # with that name is focused, the last one gives the parsed and built value
+        self._main_flags = self._find_main_flags(parsebuildfrom) if isinstance(parsebuildfrom, str) else None
+        self._main_scs = tuple(sc for sc, main in zip(self.subcons, self._main_flags or ()) if main)
+
+    def _find_main_flags(self, parsebuildfrom):
+        return tuple(sc.name == parsebuildfrom for sc in self.subcons)
 
     def __getattr__(self, name):
         if name in self._subcons:
             return self._subcons[name]
         raise AttributeError
 
+    def _create_context(self, context, stream):
+        # filled by item assignment, which is about twice as fast as passing the entries as keywords to Container
+        ctx = Container()
+        ctx["_"] = context
+        ctx["_params"] = context["_params"]
+        ctx["_root"] = context.get("_root", ctx)
+        ctx["_parsing"] = context["_parsing"]
+        ctx["_building"] = context["_building"]
+        ctx["_sizing"] = context["_sizing"]
+        ctx["_subcons"] = self._subcons
+        ctx["_io"] = stream
+        ctx["_index"] = context.get("_index", None)
+        return ctx
+
     def _parse(self, stream, context, path):
-        context = Container(_ = context, _params = context._params, _root = None, _parsing = context._parsing, _building = context._building, _sizing = context._sizing, _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
-        context._root = context._.get("_root", context)
-        parsebuildfrom = evaluate(self.parsebuildfrom, context)
-        for i,sc in enumerate(self.subcons):
+        context = self._create_context(context, stream)
+        main_flags = self._main_flags
+        if main_flags is None:
+            main_flags = self._find_main_flags(evaluate(self.parsebuildfrom, context))
+        for sc, main in zip(self.subcons, main_flags):
             parseret = sc._parsereport(stream, context, path)
             if sc.name:
                 context[sc.name] = parseret
-            if sc.name == parsebuildfrom:
+            if main:
                 finalret = parseret
         return finalret
 
     def _build(self, obj, stream, context, path):
-        context = Container(_ = context, _params = context._params, _root = None, _parsing = context._parsing, _building = context._building, _sizing = context._sizing, _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
-        context._root = context._.get("_root", context)
+        context = self._create_context(context, stream)
         parsebuildfrom = evaluate(self.parsebuildfrom, context)
+        main_flags = self._main_flags
+        if main_flags is None:
+            main_flags = self._find_main_flags(parsebuildfrom)
         context[parsebuildfrom] = obj
-        for i,sc in enumerate(self.subcons):
-            buildret = sc._build(obj if sc.name == parsebuildfrom else None, stream, context, path)
+        for sc, main in zip(self.subcons, main_flags):
+            if main:
+                finalret = buildret = sc._build(obj, stream, context, path)
+            else:
+                buildret = sc._build(None, stream, context, path)
             if sc.name:
                 context[sc.name] = buildret
-            if sc.name == parsebuildfrom:
-                finalret = buildret
         return finalret
 
     def _toET(self, parent, name, context, path):
         assert (isinstance(self.parsebuildfrom, str))
-        for sc in self.subcons:
-            if sc.name == self.parsebuildfrom:
-                # FocusedSeq has to ignore the Rename
-                # because e.g. PrefixedArray adds custom names
-                if sc.__class__.__name__ == "Renamed":
-                    sc = sc.subcon
-                else:
-                    raise NotImplementedError
-                elem = sc._toET(parent, name, context, path)
-
-                return elem
+        if not self._main_scs:
+            raise NotImplementedError
+        sc = self._main_scs[0]
+        # FocusedSeq has to ignore the Rename
+        # because e.g. PrefixedArray adds custom names
+        if sc.__class__.__name__ == "Renamed":
+            sc = sc.subcon
+        else:
+            raise NotImplementedError
+        elem = sc._toET(parent, name, context, path)
 
-        raise NotImplementedError
+        return elem
 
     def _fromET(self, parent, name, context, path, is_root=False):
-        parse_sc = None
-        for sc in self.subcons:
-            if sc.name == self.parsebuildfrom:
-                parse_sc = sc
-                # Necessary to find the sc in the parent
-                assert (sc.__class__.__name__ == "Renamed")
-        assert(parse_sc is not None)
+        assert(self._main_scs)
+        parse_sc = self._main_scs[-1]
+        # Necessary to find the sc in the parent
+        assert (parse_sc.__class__.__name__ == "Renamed")
 
         # get the xml element
         if not is_root and not parse_sc._is_array():
@@ -2536,13 +2913,8 @@ class FocusedSeq(Construct):
         assert(False)
 
     def _get_main_sc(self):
-        sc = None
-        for s in self.subcons:
-            if s.name == self.parsebuildfrom:
-                sc = s
-                break
-        assert(sc is not None)
-        return sc
+        assert(self._main_scs)
+        return self._main_scs[0]
 
     def _static_sizeof(self, context: Container, path: str) -> int:
         try:
@@ -2558,8 +2930,9 @@ class FocusedSeq(Construct):
             pass
         try:
             size_sum = 0
-            for sc in self.subcons:
-                if sc.name == self.parsebuildfrom:
+            main_flags = self._main_flags or (False,) * len(self.subcons)
+            for sc, main in zip(self.subcons, main_flags):
+                if main:
                     size_sum += sc._sizeof(obj, context, path)
                 else:
                     size_sum += sc._static_sizeof(context, path)
@@ -2579,6 +2952,14 @@ class FocusedSeq(Construct):
         return self._get_main_sc()._is_array()
 
 
+def _require_numpy():
+    """Used internally. Returns the numpy module, which is looked up only once."""
+    numpy = _numpy()
+    if not numpy:
+        raise ImportError("numpy could not be imported")
+    return numpy
+
+
 @singleton
 class Numpy(Construct):
     r"""
@@ -2602,12 +2983,10 @@ class Numpy(Construct):
     """
 
     def _parse(self, stream, context, path):
-        import numpy
-        return numpy.load(stream)
+        return _require_numpy().load(stream)
 
     def _build(self, obj, stream, context, path):
-        import numpy
-        numpy.save(stream, obj)
+        _require_numpy().save(stream, obj)
         return obj
 
 
@@ -2823,8 +3202,8 @@ class Union(Construct):
 
     def _parse(self, stream, context, path):
         obj = Container()
-        context = Container(_ = context, _params = context._params, _root = None, _parsing = context._parsing, _building = context._building, _sizing = context._sizing, _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
-        context._root = context._.get("_root", context)
+        context = Container(_ = context, _params = context["_params"], _root = None, _parsing = context["_parsing"], _building = context["_building"], _sizing = context["_sizing"], _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
+        context["_root"] = context["_"].get("_root", context)
         fallback = stream_tell(stream, path)
         forwards = {}
         for i,sc in enumerate(self.subcons):
@@ -2842,8 +3221,8 @@ class Union(Construct):
         return obj
 
     def _build(self, obj, stream, context, path):
-        context = Container(_ = context, _params = context._params, _root = None, _parsing = context._parsing, _building = context._building, _sizing = context._sizing, _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
-        context._root = context._.get("_root", context)
+        context = Container(_ = context, _params = context["_params"], _root = None, _parsing = context["_parsing"], _building = context["_building"], _sizing = context["_sizing"], _subcons = self._subcons, _io = stream, _index = context.get("_index", None))
+        context["_root"] = context["_"].get("_root", context)
         context.update(obj)
         for sc in self.subcons:
             if sc.flagbuildnone:
@@ -3810,6 +4189,9 @@ class Pass(Construct):
     def _build(self, obj, stream, context, path):
         return obj
 
+    def _is_context_free(self):
+        return True
+
     def _static_sizeof(self, context, path):
         return 0
 
@@ -3857,11 +4239,26 @@ class Terminated(Construct):
 #===============================================================================
 # tunneling and byte/bit swapping
 #===============================================================================
+class RawCopyContainer(Container):
+    r"""
+    Container returned by :class:`~dingsda.core.RawCopy` when parsing. Behaves like any other Container, but fills its fixed set of keys (data value offset1 offset2 length) positionally instead of going through keyword arguments, and does not add any per-instance attributes.
+    """
+    __slots__ = ()
+
+    def __init__(self, data=None, value=None, offset1=None, offset2=None):
+        super().__init__()
+        self["data"] = data
+        self["value"] = value
+        self["offset1"] = offset1
+        self["offset2"] = offset2
+        self["length"] = None if offset1 is None else offset2 - offset1
+
+
 class RawCopy(Subconstruct):
     r"""
     Used to obtain byte representation of a field (aside of object value).
 
-    Returns a dict containing both parsed subcon value, the raw bytes that were consumed by subcon, starting and ending offset in the stream, and amount in bytes. Builds either from raw bytes representation or a value used by subcon. Size is same as subcon.
+    Returns a :class:`~dingsda.core.RawCopyContainer` containing both parsed subcon value, the raw bytes that were consumed by subcon, starting and ending offset in the stream, and amount in bytes. Builds either from raw bytes representation or a value used by subcon. Size is same as subcon.
 
     Object is a dictionary with either "data" or "value" keys, or both.
 
@@ -3884,13 +4281,27 @@ class RawCopy(Subconstruct):
         '\xff'
     """
 
+    def __init__(self, subcon):
+        super().__init__(subcon)
+        # if the subcon has a static size, the raw bytes can be read upfront, saving a tell after parsing. probed with
+        # an unavailable context like in Struct, so subcons depending on the context fall back to the tell
+        try:
+            self._static_size = subcon._static_sizeof(_UnavailableContext(), "")
+        except Exception:
+            self._static_size = None
+
     def _parse(self, stream, context, path):
         offset1 = stream_tell(stream, path)
+        if self._static_size is not None:
+            data = stream_read(stream, self._static_size, path)
+            stream_seek(stream, offset1, 0, path)
+            obj = self.subcon._parsereport(stream, context, path)
+            return RawCopyContainer(data, obj, offset1, offset1 + self._static_size)
         obj = self.subcon._parsereport(stream, context, path)
         offset2 = stream_tell(stream, path)
         stream_seek(stream, offset1, 0, path)
         data = stream_read(stream, offset2 - offset1, path)
-        return Container(data=data, value=obj, offset1=offset1, offset2=offset2, length=(offset2-offset1))
+        return RawCopyContainer(data, obj, offset1, offset2)
 
     def _build(self, obj, stream, context, path):
         if obj is None and self.subcon.flagbuildnone:
@@ -4230,6 +4641,8 @@ class NullStripped(Subconstruct):
     def __init__(self, subcon, pad=b"\x00"):
         super().__init__(subcon)
         self.pad = pad
+        # the pads of the string classes (see encodingunit) are null bytes, which can be found with bytes.rstrip
+        self._nullpad = not pad.strip(b"\x00")
 
     def _parse(self, stream, context, path):
         pad = self.pad
@@ -4244,8 +4657,13 @@ class NullStripped(Subconstruct):
             end = len(data)
             if tailunit and data[-tailunit:] == pad[:tailunit]:
                 end -= tailunit
-            while end-unit >= 0 and data[end-unit:end] == pad:
-                end -= unit
+            if self._nullpad:
+                # only whole units are stripped, so the trailing null bytes are rounded down to the unit
+                nulls = end - len(data[:end].rstrip(b"\x00"))
+                end -= nulls - nulls % unit
+            else:
+                while end-unit >= 0 and data[end-unit:end] == pad:
+                    end -= unit
             data = data[:end]
         return self.subcon._parsereport(io.BytesIO(data), context, path)
 
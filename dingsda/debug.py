@@ -1,6 +1,6 @@
 from dingsda.core import Construct, Subconstruct
 from dingsda.lib import *
-import sys, traceback, pdb, inspect
+import sys, traceback, inspect
 
 from typing import Any
 
@@ -145,5 +145,6 @@ class Debugger(Subconstruct):
         print("".join(traceback.format_exception(*sys.exc_info())[1:]))
         if msg:
             print(msg)
+        import pdb
         pdb.post_mortem(sys.exc_info()[2])
         print("--------------------------------------------------")
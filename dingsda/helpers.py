@@ -1,4 +1,4 @@
-import pdb
+import io
 from typing import Any, Optional
 from dingsda.errors import StreamError, StringError
 from dingsda.lib import bytestringtype
@@ -56,24 +56,33 @@ def create_parent_context(context):
     return ctx
 
 
+def create_root_context(contextkw: dict, parsing: bool = False, building: bool = False, sizing: bool = False, preprocessing: bool = False) -> Container:
+    """ Creates the top level context used by the entry points (parse, build, sizeof, ...).
+    The mode flags are passed to the Container constructor at once instead of being set one by one. """
+    ctx = Container(contextkw, _preprocessing=preprocessing, _parsing=parsing, _building=building, _sizing=sizing)
+    ctx["_params"] = ctx
+    return ctx
+
+
 def create_child_context(context: Container, obj: Optional[Container]) -> Container:
     """ Creates a new context for the child node. Used e.g. in Struct when building,
     will fail, if child is not a Container. """
     if obj is None:
         obj = {}
 
-    ret = Container(obj)
-    ctx = Container(_params = context.get("_params", None),
-                    _root = context.get("_root", context),
-                    _ = context,
-                    _parsing = context.get("_parsing", False),
-                    _building = context.get("_building", False),
-                    _sizing = context.get("_sizing", False),
-                    _subcons = context.get("_subcons", None),
-                    _preprocessing = context.get('_preprocessing', False),
-                    _index = context.get("_index", None))
-    ret.update(ctx)
-    return ret
+    # the entries of obj and the context entries are passed to a single constructor call, instead of building a
+    # second Container and copying it over with the Python level Container.update
+    get = context.get
+    return Container(obj,
+                     _params = get("_params", None),
+                     _root = get("_root", context),
+                     _ = context,
+                     _parsing = get("_parsing", False),
+                     _building = get("_building", False),
+                     _sizing = get("_sizing", False),
+                     _subcons = get("_subcons", None),
+                     _preprocessing = get('_preprocessing', False),
+                     _index = get("_index", None))
 
 
 def insert_or_append_field(context: Container, name: str, value: Any) -> Container:
@@ -145,6 +154,13 @@ def evaluate(param: Any, context: Container, recurse: bool = False):
 
 
 def stream_read(stream, length, path):
+    # fast path for in-memory streams (the parse() case), BytesIO.read cannot fail for a valid length, so neither the
+    # try block nor the length check are needed. the parsers call this instead of inlining their own copy
+    if type(stream) is io.BytesIO and type(length) is int and length >= 0:
+        data = stream.read(length)
+        if len(data) != length:
+            raise StreamError("stream read less than specified amount, expected %d, found %d" % (length, len(data)), path=path)
+        return data
     if length < 0:
         raise StreamError("length must be non-negative, found %s" % length, path=path)
     try:
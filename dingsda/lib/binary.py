@@ -1,8 +1,15 @@
 from dingsda import *
 from dingsda.lib import *
+import array
 import binascii
 
 
+# the conversions go through a single Python integer and its binary string representation, so all bytes are processed
+# at once by C code instead of one table lookup per byte
+BITCHARS2BITS = bytes.maketrans(b"01", b"\x00\x01")
+BITS2BITCHARS = bytes.maketrans(b"\x00\x01", b"01")
+
+
 def integer2bits(number, width, signed=False):
     r"""
     Converts an integer into its binary representation in a bit-string. Width is the amount of bits to generate. Each bit is represented as either \\x00 or \\x01. The most significant bit is first, big-endian. This is reverse to `bits2integer`.
@@ -26,13 +33,9 @@ def integer2bits(number, width, signed=False):
 
     if number < 0:
         number += 1 << width
-    bits = bytearray(width)
-    i = width - 1
-    while number and i >= 0:
-        bits[i] = number & 1
-        number >>= 1
-        i -= 1
-    return bytes(bits)
+    if width == 1:
+        return b"\x01" if number else b"\x00"
+    return bin(number)[2:].zfill(width).encode("ascii").translate(BITCHARS2BITS)
 
 
 def integer2bytes(number, width, signed=False):
@@ -66,9 +69,10 @@ def bits2integer(data, signed=False):
     if data == b"":
         raise ValueError("bit-string cannot be empty")
 
-    number = 0
-    for b in data:
-        number = (number << 1) | b
+    if len(data) == 1:
+        number = data[0]
+    else:
+        number = int(data.translate(BITS2BITCHARS), 2)
 
     if signed and data[0]:
         bias = 1 << len(data)
@@ -92,7 +96,22 @@ def bytes2integer(data, signed=False):
     return int.from_bytes(data, 'big', signed=signed)
 
 
-BYTES2BITS_CACHE = {i:integer2bits(i,8) for i in range(256)}
+#: Inputs of at least this many bytes are converted with numpy, if it is installed. Below that the call overhead of numpy dominates.
+NUMPY_BITS_THRESHOLD = 64
+
+_numpy_module = None
+def _numpy():
+    """Used internally. Returns the numpy module, or False if it is not installed."""
+    global _numpy_module
+    if _numpy_module is None:
+        try:
+            import numpy
+            _numpy_module = numpy
+        except ImportError:
+            _numpy_module = False
+    return _numpy_module
+
+
 def bytes2bits(data):
     r""" 
     Converts between bit-string and byte-string representations, both as bytes type.
@@ -102,10 +121,15 @@ def bytes2bits(data):
         >>> bytes2bits(b'ab')
         b"\x00\x01\x01\x00\x00\x00\x00\x01\x00\x01\x01\x00\x00\x00\x01\x00"
     """
-    return b"".join(BYTES2BITS_CACHE[b] for b in data)
+    if len(data) >= NUMPY_BITS_THRESHOLD:
+        np = _numpy()
+        if np:
+            return np.unpackbits(np.frombuffer(data, dtype=np.uint8)).tobytes()
+    if not data:
+        return b""
+    return format(int.from_bytes(data, "big"), "0%db" % (8*len(data))).encode("ascii").translate(BITCHARS2BITS)
 
 
-BITS2BYTES_CACHE = {bytes2bits(int2byte(i)):i for i in range(256)}
 def bits2bytes(data):
     r""" 
     Converts between bit-string and byte-string representations, both as bytes type. Its length must be multiple of 8.
@@ -117,7 +141,18 @@ def bits2bytes(data):
     """
     if len(data) % 8 != 0:
         raise ValueError(f"data length {len(data)} must be a multiple of 8")
-    return bytes(BITS2BYTES_CACHE[data[i:i+8]] for i in range(0,len(data),8))
+    if len(data) >= 8*NUMPY_BITS_THRESHOLD:
+        np = _numpy()
+        if np:
+            bits = np.frombuffer(data, dtype=np.uint8)
+            # packbits accepts any non-zero value as a set bit, invalid input is left to the check below
+            if bits.max() <= 1:
+                return np.packbits(bits).tobytes()
+    if not data:
+        return b""
+    if data.translate(None, b"\x00\x01"):
+        raise ValueError("bit-string may only contain \\x00 and \\x01 bytes")
+    return int(data.translate(BITS2BITCHARS), 2).to_bytes(len(data)//8, "big")
 
 
 def swapbytes(data):
@@ -132,6 +167,7 @@ def swapbytes(data):
     return data[::-1]
 
 
+_ARRAY_WORD8 = next((t for t in "QLI" if array.array(t).itemsize == 8), None)
 def swapbytesinbits(data):
     r"""
     Performs an byte-swap within a bit-string. Its length must be multiple of 8.
@@ -143,6 +179,11 @@ def swapbytesinbits(data):
     """
     if len(data) % 8 != 0:
         raise ValueError(f"little-endianness is only defined if data length {len(data)} is multiple of 8")
+    if _ARRAY_WORD8:
+        # each swapped byte is 8 bytes of the bit-string, so it fits one machine word and reversing the words is a single C call
+        words = array.array(_ARRAY_WORD8, data)
+        words.reverse()
+        return words.tobytes()
     return b"".join(data[i:i+8] for i in reversed(range(0,len(data),8)))
 
 
@@ -1,3 +1,5 @@
+import functools
+import io
 import struct
 
 import sys
@@ -9,6 +11,25 @@ from dingsda.lib import *
 
 native = (sys.byteorder == "little")
 
+# shared 1-byte objects, so single byte writes do not allocate a new bytes object every time
+_BYTE_SINGLETONS = tuple(bytes((i,)) for i in range(256))
+
+_FORMATFIELD_ENDIANITIES = frozenset("=<>")
+_FORMATFIELD_INT_FORMATS = frozenset("BHLQbhlq")
+_FORMATFIELD_FLOAT_FORMATS = frozenset("efd")
+_FORMATFIELD_FORMATS = _FORMATFIELD_INT_FORMATS | _FORMATFIELD_FLOAT_FORMATS | {"?"}
+
+def _str2bool(data):
+    """Used internally. Reverse of str() for booleans, used for XML attributes of the ? format."""
+    if data == "True":
+        return True
+    if data == "False":
+        return False
+    raise ValueError(f"invalid boolean {data!r}")
+
+# there are only a few dozen valid format strings, so FormatFields with the same format share one compiled Struct
+_compiled_struct = functools.lru_cache(maxsize=None)(struct.Struct)
+
 
 class FormatField(Construct):
     r"""
@@ -36,33 +57,85 @@ class FormatField(Construct):
     """
 
     def __init__(self, endianity, format):
-        if endianity not in list("=<>"):
+        if endianity not in _FORMATFIELD_ENDIANITIES:
             raise FormatFieldError("endianity must be like: = < >", endianity)
-        if format not in list("fdBHLQbhlqe?"):
+        if format not in _FORMATFIELD_FORMATS:
             raise FormatFieldError("format must be like: B H L Q b h l q e f d ?", format)
 
         super().__init__()
         self.fmtstr = endianity+format
-        self.length = struct.calcsize(endianity+format)
+        # precompiled, so the format string does not have to be looked up on every call.
+        # this is also used for integer formats, a precompiled Struct is faster than int.from_bytes/int.to_bytes
+        self._struct = _compiled_struct(self.fmtstr)
+        self.length = self._struct.size
+        # 8-bit integers do not need struct at all, the byte is indexed directly
+        self._int8 = format if format in "Bb" else None
+        # converts XML attribute strings back into values
+        self._et_cast = int if format in _FORMATFIELD_INT_FORMATS else float if format in _FORMATFIELD_FLOAT_FORMATS else _str2bool
+
+    def __getstate__(self):
+        attrs = super().__getstate__()
+        # struct.Struct objects cannot be pickled, it is recreated from fmtstr
+        attrs.pop("_struct", None)
+        return attrs
+
+    def __setstate__(self, attrs):
+        super().__setstate__(attrs)
+        self._struct = _compiled_struct(self.fmtstr)
 
     def _parse(self, stream, context, path):
-        data = stream_read(stream, self.length, path)
-        try:
-            return struct.unpack(self.fmtstr, data)[0]
-        except Exception:
-            raise FormatFieldError("struct %r error during parsing" % self.fmtstr, path=path)
+        int8 = self._int8
+        length = self.length
+        data = stream_read(stream, length, path)
+        if int8 is not None:
+            b = data[0]
+            return b - 256 if int8 == "b" and b & 0x80 else b
+        # stream_read already guarantees the exact length, and every byte pattern is valid for
+        # these formats, so unpack cannot fail here
+        return self._struct.unpack(data)[0]
 
     def _build(self, obj, stream, context, path):
+        int8 = self._int8
+        # out of range values fall through to struct, which raises the error
+        if int8 is not None and obj.__class__ is int and (0 <= obj <= 0xff if int8 == "B" else -0x80 <= obj <= 0x7f):
+            data = _BYTE_SINGLETONS[obj & 0xff]
+        else:
+            # values are not range checked up front, try blocks cost nothing when no exception is raised
+            try:
+                data = self._struct.pack(evaluate(obj, context))
+            except Exception:
+                raise FormatFieldError("struct %r error during building, given value %r" % (self.fmtstr, obj), path=path)
+        # inlined stream_write for in-memory streams, data always has the exact length here
+        if type(stream) is io.BytesIO:
+            stream.write(data)
+        else:
+            stream_write(stream, data, self.length, path)
+        return obj
+
+    def _parse_batch(self, stream, count, context, path):
+        # used by Array, all elements are unpacked by a single struct call. struct caches the compiled formats itself.
+        data = stream_read(stream, count * self.length, path)
+        if count == 1:
+            return self._struct.unpack(data)
+        return struct.unpack(f"{self.fmtstr[0]}{count}{self.fmtstr[1]}", data)
+
+    def _build_batch(self, objs, stream, context, path):
+        # bytes already are the packed form of unsigned bytes
+        if self._int8 == "B" and type(objs) in (bytes, bytearray):
+            stream_write(stream, bytes(objs), len(objs), path)
+            return True
         try:
-            data = struct.pack(self.fmtstr, evaluate(obj, context))
+            if len(objs) == 1:
+                data = self._struct.pack(*objs)
+            else:
+                data = struct.pack(f"{self.fmtstr[0]}{len(objs)}{self.fmtstr[1]}", *objs)
         except Exception:
-            raise FormatFieldError("struct %r error during building, given value %r" % (self.fmtstr, obj), path=path)
-        stream_write(stream, data, self.length, path)
-        return obj
+            # context lambdas or invalid values, the elements are built one by one, which also reports the error
+            return False
+        stream_write(stream, data, len(data), path)
+        return True
 
     def _toET(self, parent, name, context, path):
-        assert (name is not None)
-
         data = str(get_current_field(context, name))
         if parent is None:
             return data
@@ -71,23 +144,13 @@ class FormatField(Construct):
         return None
 
     def _fromET(self, parent, name, context, path, is_root=False):
-        assert(parent is not None)
-        assert(name is not None)
-
         if isinstance(parent, str):
             elem = parent
         else:
             elem = parent.attrib[name]
 
-        assert (len(self.fmtstr) == 2)
-        if self.fmtstr[1] in ["B", "H", "L", "Q", "b", "h", "l", "q"]:
-            insert_or_append_field(context, name, int(elem))
-            return context
-        elif self.fmtstr[1] in ["e", "f", "d"]:
-            insert_or_append_field(context, name, float(elem))
-            return context
-
-        assert (0)
+        insert_or_append_field(context, name, self._et_cast(elem))
+        return context
 
     def _static_sizeof(self, context: Container, path: str) -> int:
         return self.length
@@ -95,6 +158,13 @@ class FormatField(Construct):
     def _is_simple_type(self) -> bool:
         return True
 
+    def _is_context_free(self) -> bool:
+        return True
+
+    def _is_str_formatted(self) -> bool:
+        # not for subclasses formatting the value differently
+        return type(self)._toET is FormatField._toET
+
 class BytesInteger(Construct):
     r"""
     Field that packs integers of arbitrary size. Int24* fields use this class.
@@ -137,31 +207,39 @@ class BytesInteger(Construct):
         self.length = length
         self.signed = signed
         self.swapped = swapped
+        # constant parameters are resolved once here instead of per parse/build call
+        self._length_callable = callable(length)
+        self._byteorder = None if callable(swapped) else ("little" if swapped else "big")
 
     def _parse(self, stream, context, path):
-        length = evaluate(self.length, context)
+        length = self.length
+        if self._length_callable:
+            length = length(context)
         if length <= 0:
             raise IntegerError(f"length {length} must be positive", path=path)
         data = stream_read(stream, length, path)
-        if evaluate(self.swapped, context):
-            data = swapbytes(data)
-        try:
-            return bytes2integer(data, self.signed)
-        except ValueError as e:
-            raise IntegerError(str(e), path=path)
+        # int.from_bytes handles the byte order itself, no swapped copy of the data is needed
+        byteorder = self._byteorder or ("little" if self.swapped(context) else "big")
+        return int.from_bytes(data, byteorder, signed=self.signed)
 
     def _build(self, obj, stream, context, path):
         if not isinstance(obj, integertypes):
             raise IntegerError(f"value {obj} is not an integer", path=path)
-        length = evaluate(self.length, context)
+        length = self.length
+        if self._length_callable:
+            length = length(context)
         if length <= 0:
             raise IntegerError(f"length {length} must be positive", path=path)
+        signed = self.signed
+        if length == 1 and (-0x80 <= obj <= 0x7f if signed else 0 <= obj <= 0xff):
+            # byte order does not matter for a single byte
+            stream_write(stream, _BYTE_SINGLETONS[obj & 0xff], 1, path)
+            return obj
+        byteorder = self._byteorder or ("little" if self.swapped(context) else "big")
         try:
-            data = integer2bytes(obj, length, self.signed)
-        except ValueError as e:
-            raise IntegerError(str(e), path=path)
-        if evaluate(self.swapped, context):
-            data = swapbytes(data)
+            data = obj.to_bytes(length, byteorder, signed=signed)
+        except OverflowError:
+            raise IntegerError(f"number {obj} does not fit width {length}, signed {signed}", path=path)
         stream_write(stream, data, length, path)
         return obj
 
@@ -177,6 +255,9 @@ class BytesInteger(Construct):
         except (KeyError, AttributeError):
             raise SizeofError("cannot calculate size, key not found in context", path=path)
 
+    def _is_context_free(self) -> bool:
+        return not self._length_callable and self._byteorder is not None
+
 
 class BitsInteger(Construct):
     r"""
@@ -246,14 +327,19 @@ class BitsInteger(Construct):
         self.length = length
         self.signed = signed
         self.swapped = swapped
+        # constant parameters are resolved once here instead of per parse/build call
+        self._length_callable = callable(length)
+        self._swapped_callable = callable(swapped)
 
     def _parse(self, stream, context, path):
-        length = evaluate(self.length, context)
+        length = self.length
+        if self._length_callable:
+            length = length(context)
         if length <= 0:
             raise IntegerError(f"length {length} must be positive", path=path)
         data = stream_read(stream, length, path)
         try:
-            if evaluate(self.swapped, context):
+            if (self.swapped(context) if self._swapped_callable else self.swapped):
                 data = swapbytesinbits(data)
             return bits2integer(data, self.signed)
         except ValueError as e:
@@ -262,12 +348,14 @@ class BitsInteger(Construct):
     def _build(self, obj, stream, context, path):
         if not isinstance(obj, integertypes):
             raise IntegerError(f"value {obj} is not an integer", path=path)
-        length = evaluate(self.length, context)
+        length = self.length
+        if self._length_callable:
+            length = length(context)
         if length <= 0:
             raise IntegerError(f"length {length} must be positive", path=path)
         try:
             data = integer2bits(obj, length, self.signed)
-            if evaluate(self.swapped, context):
+            if (self.swapped(context) if self._swapped_callable else self.swapped):
                 data = swapbytesinbits(data)
         except ValueError as e:
             raise IntegerError(str(e), path=path)
@@ -286,6 +374,9 @@ class BitsInteger(Construct):
         except (KeyError, AttributeError):
             raise SizeofError("cannot calculate size, key not found in context", path=path)
 
+    def _is_context_free(self) -> bool:
+        return not self._length_callable and not self._swapped_callable
+
 
 @singleton
 def Bit():
@@ -321,22 +412,36 @@ class VarInt(Construct):
     """
 
     def _parse(self, stream, context, path):
-        acc = []
-        while True:
-            b = byte2int(stream_read(stream, 1, path))
-            acc.append(b & 0b01111111)
-            if b & 0b10000000 == 0:
-                break
+        # in-memory streams are read directly, an empty read at EOF shows up as IndexError below
+        if type(stream) is io.BytesIO:
+            read = stream.read
+        else:
+            read = lambda n: stream_read(stream, n, path)
+        # least significant group comes first, so the number is accumulated directly without a list of groups
         num = 0
-        for b in reversed(acc):
-            num = (num << 7) | b
-        return num
+        shift = 0
+        try:
+            while True:
+                b = read(1)[0]
+                num |= (b & 0b01111111) << shift
+                if b < 0b10000000:
+                    return num
+                shift += 7
+        except IndexError:
+            raise StreamError("stream read less than specified amount, expected 1, found 0", path=path)
 
     def _build(self, obj, stream, context, path):
         if not isinstance(obj, integertypes):
             raise IntegerError(f"value {obj} is not an integer", path=path)
         if obj < 0:
             raise IntegerError(f"VarInt cannot build from negative number {obj}", path=path)
+        # most varints (tags, small lengths) fit into one or two bytes
+        if obj < 0x80:
+            stream_write(stream, _BYTE_SINGLETONS[obj], 1, path)
+            return obj
+        if obj < 0x4000:
+            stream_write(stream, bytes((0x80 | (obj & 0x7f), obj >> 7)), 2, path)
+            return obj
         x = obj
         B = bytearray()
         while x > 0b01111111:
@@ -346,6 +451,9 @@ class VarInt(Construct):
         stream_write(stream, bytes(B), len(B), path)
         return obj
 
+    def _is_context_free(self) -> bool:
+        return True
+
 
 @singleton
 class ZigZag(Construct):
@@ -369,22 +477,19 @@ class ZigZag(Construct):
 
     def _parse(self, stream, context, path):
         x = VarInt._parse(stream, context, path)
-        if x & 1 == 0:
-            x = x//2
-        else:
-            x = -(x//2+1)
-        return x
+        # branchless decoding as in the protobuf reference, -(x & 1) is either 0 or an all-ones mask
+        return (x >> 1) ^ -(x & 1)
 
     def _build(self, obj, stream, context, path):
         if not isinstance(obj, integertypes):
             raise IntegerError(f"value {obj} is not an integer", path=path)
-        if obj >= 0:
-            x = 2*obj
-        else:
-            x = 2*abs(obj)-1
-        VarInt._build(x, stream, context, path)
+        # same as (obj << 1) ^ (obj >> 63) in protobuf, but without a fixed width for python ints
+        VarInt._build((obj << 1) ^ -(obj < 0), stream, context, path)
         return obj
 
+    def _is_context_free(self) -> bool:
+        return True
+
 
 @singleton
 def Int8ub():
@@ -1,3 +1,5 @@
+import codecs
+
 from dingsda.core import Adapter, Prefixed, GreedyBytes, FixedSized, NullStripped, NullTerminated
 from dingsda.helpers import *
 from dingsda.errors import *
@@ -115,6 +117,10 @@ def GreedyString(encoding):
     return macro
 
 
+#: Codecs that bytes.decode and str.encode handle without looking them up in the codec registry.
+_BUILTIN_FAST_CODECS = {"utf-8", "ascii", "iso8859-1", "utf-16", "utf-32"}
+
+
 class StringEncoded(Adapter):
     """Used internally."""
 
@@ -123,8 +129,35 @@ class StringEncoded(Adapter):
         if not encoding:
             raise StringError("String* classes require explicit encoding")
         self.encoding = encoding
+        self._lookup_codec()
+
+    def _lookup_codec(self):
+        # other codecs are looked up by name on every call otherwise, so their functions are resolved once here.
+        # unknown encodings are left to fail when used, as before.
+        try:
+            codec = codecs.lookup(self.encoding)
+        except LookupError:
+            codec = None
+        if codec is None or codec.name in _BUILTIN_FAST_CODECS:
+            self._decoder = self._encoder = None
+        else:
+            self._decoder = codec.decode
+            self._encoder = codec.encode
+
+    def __getstate__(self):
+        attrs = super().__getstate__()
+        # codec functions are not necessarily picklable, they are looked up again from the encoding
+        attrs.pop("_decoder", None)
+        attrs.pop("_encoder", None)
+        return attrs
+
+    def __setstate__(self, attrs):
+        super().__setstate__(attrs)
+        self._lookup_codec()
 
     def _decode(self, obj, context, path):
+        if self._decoder is not None:
+            return self._decoder(obj)[0]
         return obj.decode(self.encoding)
 
     def _encode(self, obj, context, path):
@@ -132,11 +165,11 @@ class StringEncoded(Adapter):
             raise StringError("string encoding failed, expected unicode string", path=path)
         if obj == u"":
             return b""
+        if self._encoder is not None:
+            return self._encoder(obj)[0]
         return obj.encode(self.encoding)
 
     def _toET(self, parent, name, context, path):
-        assert (name is not None)
-
         data = str(get_current_field(context, name))
         if parent is None:
             return data
@@ -145,9 +178,6 @@ class StringEncoded(Adapter):
         return None
 
     def _fromET(self, parent, name, context, path, is_root=False):
-        assert(parent is not None)
-        assert(name is not None)
-
         if isinstance(parent, str):
             elem = parent
         else:
@@ -65,6 +65,15 @@ def test_bits2bytes():
     assert bits2bytes(b"\x00\x01\x01\x00\x00\x00\x00\x01\x00\x01\x01\x00\x00\x00\x01\x00") == b"ab"
     assert raises(bits2bytes, b"\x00") == ValueError
     assert raises(bits2bytes, b"\x00\x00\x00\x00\x00\x00\x00") == ValueError
+    assert raises(bits2bytes, b"01010101") == ValueError
+
+def test_bytes2bits_large():
+    # large inputs may be converted by numpy, results must match the lookup tables
+    data = bytes(range(256)) * 2
+    bits = bytes2bits(data)
+    assert bits == b"".join(integer2bits(b, 8) for b in data)
+    assert bits2bytes(bits) == data
+    assert raises(bits2bytes, b"\x02" * len(bits)) == ValueError
 
 def test_swapbytes():
     assert swapbytes(b"") == b""
@@ -73,6 +82,7 @@ def test_swapbytes():
 def test_swapbytesinbits():
     assert swapbytesinbits(b"") == b""
     assert swapbytesinbits(b"0000000011111111") == b"1111111100000000"
+    assert swapbytesinbits(b"0123456789abcdefABCDEFGH") == b"ABCDEFGH89abcdef01234567"
     assert raises(swapbytesinbits, b"1") == ValueError
 
 def test_swapbitsinbytes():
@@ -61,7 +61,8 @@ def test_flag():
     d = Flag
     common(d, b"\x00", False, 1)
     common(d, b"\x01", True, 1)
-    d.parse(b"\xff") == True
+    assert d.parse(b"\xff") == True
+    assert raises(d.parse, b"") == StreamError
 
 def test_enum():
     d = Enum(Byte, one=1, two=2, four=4, eight=8)
@@ -72,6 +73,9 @@ def test_enum():
     assert int(d.parse(b"\x01")) == 1
     assert d.parse(b"\xff") == 255
     assert int(d.parse(b"\xff")) == 255
+    assert type(d.parse(b"\xff")) is EnumInteger
+    assert 255 not in d.decmapping
+    assert d.parse(b"\x01") is next(k for k in d.encmapping if k == "one")
     assert d.build(8) == b'\x08'
     assert d.build(255) == b"\xff"
     assert d.build(d.eight) == b'\x08'
@@ -79,6 +83,14 @@ def test_enum():
     assert int(d.one) == 1
     assert raises(d.build, "unknown") == MappingError
     assert raises(lambda: d.missing) == AttributeError
+    assert vars(d)["one"] is d.parse(b"\x01")
+    # labels do not shadow attributes or methods
+    assert callable(Enum(Byte, parse=1, flagbuildnone=2).parse)
+    assert Enum(Byte, parse=1, flagbuildnone=2).flagbuildnone is False
+    import pickle
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        label = pickle.loads(pickle.dumps(d.one, protocol))
+        assert type(label) is EnumIntegerString and label == "one" and int(label) == 1
 
 def test_enum_enum34():
     import enum
@@ -142,6 +154,10 @@ def test_enum_issue_992():
 def test_flagsenum():
     d = FlagsEnum(Byte, one=1, two=2, four=4, eight=8)
     common(d, b"\x03", Container(_flagsenum=True, one=True, two=True, four=False, eight=False), 1)
+    assert vars(d)["one"] == "one" and callable(FlagsEnum(Byte, build=1).build)
+    obj = d.parse(b"\x01")
+    obj.two = True
+    assert d.parse(b"\x00") == Container(_flagsenum=True, one=False, two=False, four=False, eight=False)
     assert d.build({}) == b'\x00'
     assert d.build(dict(one=True,two=True)) == b'\x03'
     assert d.build(8) == b'\x08'
@@ -151,6 +167,8 @@ def test_flagsenum():
     assert d.build(d.one|d.two) == b'\x03'
     assert raises(d.build, dict(unknown=True)) == MappingError
     assert raises(d.build, "unknown") == MappingError
+    assert d.build(d.one|d.two) == b'\x03'
+    assert d._encodecache == {"one|two": 3, "eight": 8}
     assert d.one == "one"
     assert d.one|d.two == "one|two"
     assert raises(lambda: d.missing) == AttributeError
@@ -229,6 +247,31 @@ def test_struct_sizeof_context_nesting():
     )
     size_test(d, {}, 0, 0, None)
 
+def test_struct_sizeof_cached():
+    d = Struct("a"/Int32ub, "inner"/Struct("b"/Byte, "c"/Bytes(3)), "d"/Sequence(Byte, Int16ub))
+    assert d._static_size == 11
+    size_test(d, {}, 11, 11, None)
+    # sizes depending on the context are not cached, even if they have a default
+    d = Struct("a"/Bytes(lambda ctx: ctx.get("n", 2)), "b"/Byte)
+    assert d._static_size is None
+    assert d.static_sizeof() == 3
+    assert d.static_sizeof(n=4) == 5
+    d = Struct("n"/Byte, "c"/Bytes(this.n), "d"/Int32ub)
+    assert d._static_sizes == (1, None, 4)
+    assert d.sizeof(dict(n=3, c=b"abc", d=0)) == 8
+    assert d.static_sizeof(n=3) == 8
+
+def test_struct_context_free():
+    d = Struct("a"/Int16ub, "b"/Bytes(2), "c"/Struct("d"/VarInt), Pass)
+    assert d._ctxfree
+    common(d, b"\x00\x01ab\x05", Container(a=1, b=b"ab", c=Container(d=5)), SizeofError)
+    assert not Struct("a"/Byte, "b"/Bytes(this.a))._ctxfree
+    parsed = []
+    d = Struct("a"/Byte * (lambda obj, ctx: parsed.append(obj)))
+    assert not d._ctxfree
+    assert d.parse(b"\x07") == Container(a=7)
+    assert parsed == [7]
+
 def test_sequence():
     common(Sequence(), b"", [], 0)
     common(Sequence(Int8ub, Int16ub), b"\x01\x00\x02", [1,2], 3)
@@ -265,6 +308,38 @@ def test_array():
     assert d.build([1,2,3]) == b"\x01\x02\x03"
     assert d.static_sizeof() == 3
 
+def test_array_formatfield_batch():
+    d = Array(3, Int16sl)
+    common(d, b"\x01\x00\xfe\xff\x03\x00", [1,-2,3], 6)
+    assert d.build([1, lambda ctx: 5, 3]) == b"\x01\x00\x05\x00\x03\x00"
+    assert raises(d.build, [1,2,2**20]) == FormatFieldError
+    assert raises(d.build, [1,2,"3"]) == FormatFieldError
+    assert raises(d.parse, b"\x01\x00") == StreamError
+    assert Array(3, Int16sl)._static_size == 6
+    assert Array(3, Bytes(this.n))._static_size is None
+    assert Array(3, Bytes(this.n)).static_sizeof(n=2) == 6
+    assert Array(this.n, Byte)._static_size is None
+    assert Array(3, Byte).build(b"abc") == b"abc"
+    assert Array(3, Byte).build(bytearray(b"abc")) == b"abc"
+    assert raises(Array(3, Byte).build, b"ab") == RangeError
+    # _index is set as by the element loop, a stream ending inside the array fails at the element it ends in
+    d = Struct("a"/Array(3, Int16ub), "i"/Computed(this._index))
+    assert d.parse(b"\x00\x01\x00\x02\x00\x03").i == 2
+    assert d.build(dict(a=[1,2,3])) == b"\x00\x01\x00\x02\x00\x03"
+    try:
+        Array(3, Int16ub).parse(b"\x00\x01\x00\x02\x00")
+        assert False
+    except StreamError as e:
+        assert "expected 2, found 1" in str(e)
+    d = Array(3, "x"/Int16sl)
+    assert d.subcon._parse_batch is not None
+    common(d, b"\x01\x00\xfe\xff\x03\x00", [1,-2,3], 6)
+
+    parsed = []
+    d = Array(2, Int8ub * (lambda obj, ctx: parsed.append(obj)))
+    assert d.parse(b"\x01\x02") == [1,2]
+    assert parsed == [1,2]
+
 @xfail(ONWINDOWS, reason="/dev/zero not available on Windows")
 def test_array_nontellable():
     assert Array(5, Byte).parse_stream(devzero) == [0,0,0,0,0]
@@ -282,6 +357,11 @@ def test_greedyrange():
     assert d.parse(b"\x01\x02") == []
     assert d.build([1,2]) == b"\x01\x02"
 
+    # a partial element at the end is not consumed, on in-memory and other streams
+    d = Struct("a"/GreedyRange(Int16ub), "b"/GreedyBytes)
+    assert d.parse(b"\x00\x01\x02") == Container(a=[1], b=b"\x02")
+    assert d.parse_stream(io.BufferedReader(io.BytesIO(b"\x00\x01\x02"))) == Container(a=[1], b=b"\x02")
+
 def test_repeatuntil():
     d = RepeatUntil(obj_ == 9, Byte)
     common(d, b"\x02\x03\x09", [2,3,9], SizeofError)
@@ -296,6 +376,12 @@ def test_repeatuntil():
     d = RepeatUntil(True, Byte)
     assert d.parse(b"\x00") == [0]
     assert d.build([0]) == b"\x00"
+    d = RepeatUntil(False, Byte)
+    assert raises(d.parse, b"\x00\x01") == StreamError
+    assert raises(d.build, [0,1]) == RepeatError
+    d = RepeatUntil(obj_ == 9, Byte, check_predicate=False)
+    assert d.build([2,9,3]) == b"\x02\x09\x03"
+    assert d.build([2,3]) == b"\x02\x03"
 
     d = RepeatUntil(obj_ == 9, Byte, discard=True)
     assert d.parse(b"\x02\x03\x09additionalgarbage") == []
@@ -309,6 +395,8 @@ def test_const():
     common(Const(255, Int32ul), b"\xff\x00\x00\x00", 255, 4)
     assert raises(Const(b"MZ").parse, b"???") == ConstError
     assert raises(Const(b"MZ").build, b"???") == ConstError
+    assert raises(Const(b"MZ").parse, b"M") == StreamError
+    assert Const(b"MZ").parse_stream(io.BytesIO(b"MZ?")) == b"MZ"
     assert raises(Const(255, Int32ul).parse, b"\x00\x00\x00\x00") == ConstError
     assert Struct(Const(b"MZ")).build({}) == b"MZ"
     # non-prefixed string literals are unicode on Python 3
@@ -337,6 +425,9 @@ def test_index():
     common(d, b"abbccc", [Container(i=0,d=b"a"),Container(i=1,d=b"bb"),Container(i=2,d=b"ccc")])
     d = RepeatUntil(lambda o,l,ctx: ctx._index == 2, Index)
     common(d, b"", [0,1,2])
+    # outside of a repeater there is no index
+    assert Index.parse(b"") is None
+    assert Struct("i" / Index).parse(b"") == Container(i=None)
 
 def test_rebuild():
     d = Struct(
@@ -399,6 +490,13 @@ def test_default():
     common(d, b"\xff", 255, 1)
     d.build(None) == b"\x00"
 
+def test_default_nested_parsed_hook():
+    # nested pass-through wrappers are skipped when parsing, the hook of the innermost field still has to run
+    seen = []
+    d = Default(Default(Byte * (lambda obj,ctx: seen.append(obj)), 1), 0)
+    assert d.parse(b"\xff") == 255
+    assert seen == [255]
+
 def test_check():
     common(Check(True), b"", None)
     common(Check(this.x == 255), b"", None, x=255)
@@ -427,6 +525,14 @@ def test_focusedseq():
     assert raises(d.build, {}) == KeyError
     assert raises(d.static_sizeof) == 0
 
+    # every subcon with the focused name gets the built value, the last one gives the result
+    d = FocusedSeq("x", "x"/Byte, "y"/Computed(1), "x"/Int16ub)
+    assert d.build(5) == b"\x05\x00\x05"
+    assert d.parse(b"\x01\x00\x02") == 2
+    d = FocusedSeq(this._.s, "x"/Byte, "x"/Int16ub)
+    assert d.build(5, s="x") == b"\x05\x00\x05"
+    assert d.parse(b"\x01\x00\x02", s="x") == 2
+
 def test_numpy():
     import numpy
     obj = numpy.array([1,2,3], dtype=numpy.int64)
@@ -785,8 +891,18 @@ def test_rawcopy():
     assert d.build(dict(data=b"\xff")) == b"\xff"
     assert d.build(dict(value=255)) == b"\xff"
     assert d.static_sizeof() == 1
+    obj = d.parse(b"\xff")
+    assert isinstance(obj, RawCopyContainer)
+    assert obj.value == 255 and obj.length == 1
+    d = Struct("a"/Byte, "b"/RawCopy(Struct("pos"/Tell, "x"/Int16ub)))
+    assert d.parse(b"\x01\x00\x02").b == dict(data=b"\x00\x02", value=Container(pos=1, x=2), offset1=1, offset2=3, length=2)
+    assert raises(d.parse, b"\x01\x00") == StreamError
     d = RawCopy(Padding(1))
     assert d.build(None) == b'\x00'
+    assert RawCopy(Byte)._static_size == 1
+    d = Struct("n"/Byte, "r"/RawCopy(Bytes(this.n)))
+    assert d.r.subcon._static_size is None
+    assert d.parse(b"\x02ab").r == dict(data=b"ab", value=b"ab", offset1=1, offset2=3, length=2)
 
 def test_rawcopy_issue_289():
     # When you build from a full dict that has all the keys, the if data kicks in, and replaces the context entry with a subset of a dict it had to begin with.
@@ -1284,6 +1400,11 @@ def test_repr():
 def test_operators():
     common(Struct("new" / ("old" / Byte)), b"\x01", Container(new=1), 1)
     common(Struct(Renamed(Renamed(Byte, newname="old"), newname="new")), b"\x01", Container(new=1), 1)
+    # str subclasses as names, e.g. an Enum label
+    label = Enum(Byte, a=1).a
+    d = Struct(label / Byte)
+    common(d, b"\x01", Container(a=1), 1)
+    assert type(d.subcons[0].name) is type(label)
 
     common(Array(4, Byte), b"\x01\x02\x03\x04", [1,2,3,4], 4)
     common(Byte[4], b"\x01\x02\x03\x04", [1,2,3,4], 4)
@@ -1768,6 +1889,16 @@ def test_struct_root_topmost():
     )
     assert d.parse(b"", z=2) == Container(x=1, inner=Container(inner2=Container(x=1,z=2,zz=2)))
 
+def test_params_outlive_parse():
+    import gc
+    r = Struct("x"/Computed(this._params)).parse(b"", n=1)
+    gc.collect()
+    assert r.x.n == 1
+    assert isinstance(r.x, Container)
+    r = Computed(this._params).parse(b"", n=1)
+    gc.collect()
+    assert r.n == 1
+
 def test_parsedhook_repeatersdiscard():
     outputs = []
     def printobj(obj, ctx):
@@ -2016,3 +2147,31 @@ def test_adapters_context_issue_954():
     IdentityAdapter = IdAdapter(Rebuild(Int16ub, len_(this.data)))
     TestStruct = Struct("len" / IdentityAdapter, "data" / Bytes(this.len))
     TestStruct.build({"data": b"123456"})
+
+def test_symmetricadapter():
+    class XorAdapter(SymmetricAdapter):
+        def _decode(self, obj, context, path):
+            return obj ^ 0xff
+    d = XorAdapter(Byte)
+    common(d, b"\x0f", 0xf0, 1)
+
+    class NegatingXorAdapter(XorAdapter):
+        def _encode(self, obj, context, path):
+            return obj ^ 0x0f
+    d = NegatingXorAdapter(Byte)
+    assert d.parse(b"\x0f") == 0xf0
+    assert d.build(0xf0) == b"\xff"
+
+    # an explicit _encode of an intermediate class is kept when only _decode is overridden further down
+    class ShiftedXorAdapter(NegatingXorAdapter):
+        def _decode(self, obj, context, path):
+            return obj ^ 0xf0
+    d = ShiftedXorAdapter(Byte)
+    assert d.parse(b"\x0f") == 0xff
+    assert d.build(0) == b"\x0f"
+
+    # a _decode-only subclass of a _decode-only subclass still encodes with its own _decode
+    class PlainXorAdapter(XorAdapter):
+        def _decode(self, obj, context, path):
+            return obj ^ 0x0f
+    common(PlainXorAdapter(Byte), b"\xf0", 0xff, 1)
@@ -93,6 +93,17 @@ def test_formatfield():
     assert raises(d.build, "string not int") == FormatFieldError
 
 
+def test_formatfield_int8():
+    common(Int8sb, b"\x80", -128)
+    common(Int8sb, b"\x7f", 127)
+    common(Int8ub, b"\xff", 255)
+    assert raises(Int8ub.build, 256) == FormatFieldError
+    assert raises(Int8ub.build, -1) == FormatFieldError
+    assert raises(Int8sb.build, 128) == FormatFieldError
+    assert raises(Int8sb.build, -129) == FormatFieldError
+    assert raises(Int8ub.build, 1.5) == FormatFieldError
+
+
 def test_formatfield_ints_randomized():
     for endianess,dtype in itertools.product("<>=","bhlqBHLQ"):
         d = FormatField(endianess, dtype)
@@ -198,6 +209,10 @@ def test_varint():
     assert raises(d.build, -1) == IntegerError
     assert raises(d.build, None) == IntegerError
     assert raises(d.static_sizeof) == SizeofError
+    common(d, b"\x7f", 127, SizeofError)
+    common(d, b"\x80\x01", 128, SizeofError)
+    common(d, b"\xff\x7f", 16383, SizeofError)
+    common(d, b"\x80\x80\x01", 16384, SizeofError)
 
 
 def test_varint_issue_705():
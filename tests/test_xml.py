@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from dingsda.numbers import Int8ul, Int16ul, Int32ul
+from dingsda.numbers import Int8ul, Int16ul, Int32ul, Float32l, FormatField
 from dingsda.lazy import Lazy, LazyBound
 from dingsda.string import PascalString, CString
 from tests.declarativeunittest import *
@@ -569,3 +569,32 @@ def test_xml_pass():
     data = {"a": 1, "c": 2}
     xml = b'<test a="1" c="2" />'
     common_xml_test(s, xml, data)
+
+def test_xml_unnamed_pass():
+    s = "test" / Struct(
+        "a" / Int32ul,
+        Pass,
+        "c" / Int32ul,
+        )
+
+    data = {"a": 1, "c": 2}
+    xml = b'<test a="1" c="2" />'
+    common_xml_test(s, xml, data)
+
+def test_xml_formatfield_float_bool():
+    s = "test" / Struct(
+        "a" / Float32l,
+        "b" / FormatField("<", "?"),
+        )
+
+    common_xml_test(s, b'<test a="1.5" b="True" />', {"a": 1.5, "b": True})
+    common_endtoend_xml_test(s, b'\x00\x00\xc0\x3f\x00')
+
+def test_xml_formatfield_array():
+    s = "test" / Struct(
+        "a" / Array(3, Float32l),
+        "b" / Array(2, Int8sb),
+        "c" / Array(0, Int8ub),
+        )
+
+    common_xml_test(s, b'<test a="[1.5,-2.0,0.25]" b="[-1,2]" c="[]" />', {"a": [1.5, -2.0, 0.25], "b": [-1, 2], "c": []})